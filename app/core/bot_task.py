@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+from app.core.delta_batcher import DeltaBatcher
+from app.llm.config import STREAM_RESPONSES
+from app.llm.message import ChatHistory, Message
+from app.llm.telemetry import telemetry
+
+
+class BotTask(QObject):
+    """Run one LLM request for a chat as an asyncio task on the Qt event loop.
+
+    Every signal carries the name of the chat the request belongs to, so the
+    reply lands in the right conversation even if the user switched away.
+    new_message fires for each Message the request adds to the chat history:
+    the user turn when the request starts and the reply when it completes.
+    A cancelled request keeps whatever part of the reply was streamed.
+    """
+
+    new_message = pyqtSignal(str, object)  # chat, Message
+    new_delta = pyqtSignal(str, str)  # chat, delta
+    summary_updated = pyqtSignal(str, object)  # chat, summary
+    finished = pyqtSignal()
+
+    def __init__(
+        self,
+        chat_name: str,
+        user_message: Message,
+        chat_log: ChatHistory,
+        selected_model: str,
+        stream: bool = STREAM_RESPONSES,
+        summary: dict = None,
+        recall=None,
+    ):
+        super().__init__()
+        self.chat_name = chat_name
+        self.user_message = user_message
+        self.chat_log = chat_log
+        self.selected_model = selected_model
+        self.stream = stream
+        self.summary = summary
+        self.recall = recall
+        self.task = None
+        self.cancelled = False
+        self.created = time.monotonic()
+
+    def start(self, scheduler):
+        """Queue the request on the chat scheduler."""
+        scheduler.submit(self.chat_name, self.run)
+
+    def is_running(self):
+        """Return True while the request is in flight."""
+        return self.task is not None and not self.task.done()
+
+    def cancel(self):
+        """Stop the request, or skip it if it has not started yet."""
+        self.cancelled = True
+        if self.is_running():
+            self.task.cancel()
+
+    def publish_summary(self, summary):
+        self.summary_updated.emit(self.chat_name, summary)
+
+    async def run(self):
+        # Deferred so the OpenAI SDK is not imported before the window paints;
+        # OpalApp usually has it loaded by a warm-up thread by now.
+        from app.llm.process_message import append_user_turn, process_message_async
+
+        if self.cancelled:
+            # Keep the user turn that was shown when it was sent.
+            append_user_turn(self.chat_log, self.user_message)
+            self.new_message.emit(self.chat_name, self.user_message)
+            self.finished.emit()
+            return
+        self.task = asyncio.current_task()
+        telemetry.observe(
+            "opal_llm_queue_wait_seconds",
+            self.selected_model,
+            time.monotonic() - self.created,
+        )
+        # process_message appends the user turn before its first await.
+        self.new_message.emit(self.chat_name, self.user_message)
+        try:
+            if self.stream:
+                await self.run_stream()
+                return
+            _, _, _, model_used, _ = await process_message_async(
+                self.user_message,
+                self.chat_log,
+                self.selected_model,
+                self.summary,
+                self.publish_summary,
+                self.recall,
+            )
+            logging.debug(f"Model used: {model_used}")
+            self.publish_reply()
+        except asyncio.CancelledError:
+            logging.info(f"Request for {self.chat_name} cancelled")
+            self.publish_reply()
+        except Exception as e:
+            logging.error(f"Error generating response: {e}")
+        finally:
+            self.finished.emit()
+
+    async def run_stream(self):
+        """Stream the response to the UI in batches, then post the full message."""
+        from app.llm.process_message import process_message_stream_async
+
+        batcher = DeltaBatcher(lambda text: self.new_delta.emit(self.chat_name, text))
+        try:
+            async for delta in process_message_stream_async(
+                self.user_message,
+                self.chat_log,
+                self.selected_model,
+                self.summary,
+                self.publish_summary,
+                self.recall,
+            ):
+                batcher.add(delta)
+        finally:
+            # Also stops the batcher's timer if the request is cancelled.
+            batcher.flush()
+        self.publish_reply()
+
+    def publish_reply(self):
+        """Announce the reply process_message appended to the chat history.
+
+        Only this request appends to the chat while it runs, so the reply is
+        the newest message.
+        """
+        reply = self.chat_log[-1]
+        if reply.role == "assistant":
+            self.new_message.emit(self.chat_name, reply)
@@ -0,0 +1,104 @@
+import os
+import json
+import logging
+
+from app.core.chat_store import ChatStore
+
+INDEX_VERSION = 1
+
+
+class ChatIndex:
+    """Small on-disk index of chat metadata used to populate the sidebar.
+
+    For every chat it records the message count, the file's last-modified time
+    and the byte offset up to which the file has been counted. Because chat
+    files are append-only, a grown file is indexed by scanning only the bytes
+    past the stored offset.
+    """
+
+    FILENAME = ".index.json"
+
+    def __init__(self, store: ChatStore):
+        self.store = store
+        self.path = os.path.join(store.directory, self.FILENAME)
+        self.entries = {}
+
+    def load(self):
+        """Read the index from disk, ignoring it if it is missing or corrupt."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("chats", {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            self.entries = {}
+
+    def save(self):
+        """Atomically write the index to disk."""
+        data = {"version": INDEX_VERSION, "chats": self.entries}
+        ChatStore.write_atomic(self.path, json.dumps(data))
+
+    def refresh(self):
+        """Re-index chats whose files changed since the last run."""
+        self.load()
+        changed = False
+        names = self.store.list_chats()
+        for name in set(self.entries) - set(names):
+            del self.entries[name]
+            changed = True
+        for name in names:
+            try:
+                stat = os.stat(self.store.path(name))
+            except FileNotFoundError:
+                archived = self.store.archive.info(name)
+                if archived:
+                    # Offset 0 makes a restored chat get rescanned in full.
+                    entry = {"count": archived["count"], "mtime": archived["mtime"]}
+                    entry["offset"] = 0
+                    changed = changed or self.entries.get(name) != entry
+                    self.entries[name] = entry
+                continue
+            entry = self.entries.get(name)
+            if (
+                entry
+                and entry["mtime"] == stat.st_mtime
+                and entry["offset"] == stat.st_size
+            ):
+                continue
+            try:
+                self.entries[name] = self.index_file(name, entry, stat)
+                changed = True
+            except OSError as e:
+                logging.error(f"Error indexing chat {name}: {e}")
+        if changed:
+            try:
+                self.save()
+            except OSError as e:
+                logging.error(f"Error saving chat index: {e}")
+        return self.entries
+
+    def index_file(self, name, entry, stat):
+        """Count the messages of a chat, resuming from the stored offset."""
+        if entry and 0 < entry["offset"] <= stat.st_size:
+            offset, lines = entry["offset"], entry["count"] + 1
+        else:
+            offset, lines = 0, 0
+        with open(self.store.path(name), "rb") as f:
+            f.seek(offset)
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                lines += chunk.count(b"\n")
+                offset += len(chunk)
+        return {"count": max(lines - 1, 0), "mtime": stat.st_mtime, "offset": offset}
+
+    def chats(self):
+        """Return the indexed chat names."""
+        return list(self.entries)
+
+    def rename(self, old_name, new_name):
+        """Carry an entry over to a renamed chat."""
+        if old_name in self.entries:
+            self.entries[new_name] = self.entries.pop(old_name)
+
+    def remove(self, name):
+        """Forget a deleted chat."""
+        self.entries.pop(name, None)
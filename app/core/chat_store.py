@@ -0,0 +1,596 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import shutil
+import threading
+import zipfile
+
+HEADER_FORMAT = "opal-chat"
+HEADER_VERSION = 2  # version 2 records may reference blobs instead of content
+DURABILITY_LEVELS = ("none", "batch", "message")
+
+
+class ChatStore:
+    """Append-only, line-delimited storage for chat histories.
+
+    Each chat lives in ``<chat>.jsonl``. The first line is a header record,
+    every following line is one message. New messages are appended, so saving
+    costs O(message) instead of O(history).
+
+    System prompts and very large messages are stored once in ``.blobs`` under
+    their SHA-256 and referenced from the chat file. The blobs each live chat
+    refers to are recorded in ``.blob_refs.json`` (archived chats record theirs
+    in the archive manifest), so unused blobs are found without reading any
+    chat file. The record may list blobs a chat no longer needs, never fewer.
+    Chats left idle can be
+    moved into a ChatArchive; they are read from it transparently and restored
+    to a live file when written to.
+    """
+
+    EXTENSION = ".jsonl"
+    LEGACY_EXTENSION = ".json"
+    SUMMARY_EXTENSION = ".summary.json"
+    BLOB_DIRECTORY = ".blobs"
+    ARCHIVE_DIRECTORY = ".archive"
+    BLOB_REFS = ".blob_refs.json"
+    BLOB_MIN_SIZE = 16 * 1024  # non-system messages at least this long are blobs
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.blob_directory = os.path.join(directory, self.BLOB_DIRECTORY)
+        self.archive = ChatArchive(os.path.join(directory, self.ARCHIVE_DIRECTORY))
+        self.blob_cache = {}
+        self.refs_path = os.path.join(directory, self.BLOB_REFS)
+        self.refs = None
+        # Held by every write so background compaction never races an append.
+        self.lock = threading.RLock()
+
+    def path(self, chat):
+        """Return the file path for a chat."""
+        return os.path.join(self.directory, f"{chat}{self.EXTENSION}")
+
+    def summary_path(self, chat):
+        """Return the path of the rolling summary stored alongside a chat."""
+        return os.path.join(self.directory, f"{chat}{self.SUMMARY_EXTENSION}")
+
+    def exists(self, chat):
+        """Return True if the chat has been stored, live or archived."""
+        return os.path.exists(self.path(chat)) or chat in self.archive
+
+    def list_chats(self):
+        """Return the names of all stored chats."""
+        live = []
+        if os.path.isdir(self.directory):
+            live = [
+                filename[: -len(self.EXTENSION)]
+                for filename in sorted(os.listdir(self.directory))
+                if filename.endswith(self.EXTENSION)
+            ]
+        return list(dict.fromkeys(live + sorted(self.archive.chats())))
+
+    def create(self, chat, messages=()):
+        """Atomically create a chat file holding the header and messages."""
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            data = self.serialize(messages)
+            self.set_blob_refs(chat, self.blob_refs(data))
+            self.write_atomic(self.path(chat), data)
+
+    def serialize(self, messages, created=None):
+        """Return the file contents for a chat holding messages."""
+        header = {
+            "format": HEADER_FORMAT,
+            "version": HEADER_VERSION,
+            "created": created or time.time(),
+        }
+        lines = [json.dumps(header)] + [json.dumps(self.encode(m)) for m in messages]
+        return "".join(line + "\n" for line in lines)
+
+    def append(self, chat, message, initial_messages=()):
+        """Append a message, creating the chat with initial_messages if needed."""
+        self.append_many(chat, [message], initial_messages)
+
+    def append_many(self, chat, messages, initial_messages=(), durability="none"):
+        """Append messages in one write, creating the chat if needed.
+
+        durability is one of DURABILITY_LEVELS: "batch" fsyncs once after the
+        write, "message" after every message. Returns the messages written,
+        including initial_messages if the chat was created.
+        """
+        with self.lock:
+            written = list(messages)
+            if not os.path.exists(self.path(chat)):
+                if chat in self.archive:
+                    self.restore(chat)
+                else:
+                    self.create(chat, initial_messages)
+                    written = list(initial_messages) + written
+            records = [self.encode(message) for message in messages]
+            self.add_blob_refs(chat, [r["blob"] for r in records if "blob" in r])
+            lines = [json.dumps(record) + "\n" for record in records]
+            with open(self.path(chat), "a", encoding="utf-8") as f:
+                if durability == "message":
+                    for line in lines:
+                        f.write(line)
+                        f.flush()
+                        os.fsync(f.fileno())
+                else:
+                    f.write("".join(lines))
+                    if durability == "batch":
+                        f.flush()
+                        os.fsync(f.fileno())
+            return written
+
+    def load(self, chat):
+        """Load all messages of a chat, repairing a torn trailing line.
+
+        Archived chats are read from their segment without being restored.
+        Reading takes no lock; a torn tail is checked again and truncated under
+        the lock, so an append still being written is never cut off.
+        """
+        path = self.path(chat)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            if chat not in self.archive:
+                raise
+            lines = self.archive.read(chat).splitlines(keepends=True)
+            return [self.decode(json.loads(line)) for line in lines[1:]]
+        with f:
+            messages, good_offset = self.read_records(f)
+        if good_offset == os.path.getsize(path):
+            return messages
+        with self.lock:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                return self.load(chat)  # archived meanwhile
+            with f:
+                messages, good_offset = self.read_records(f)
+            if good_offset != os.path.getsize(path):
+                self.recover_tail(path, good_offset)
+        return messages
+
+    def read_records(self, f):
+        """Return the messages of a chat file and the size of its intact part."""
+        messages = []
+        good_offset = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                break
+            if good_offset:
+                messages.append(self.decode(record))
+            good_offset += len(raw)
+        return messages, good_offset
+
+    def recover_tail(self, path, good_offset):
+        """Drop a partially written record left behind by a crash."""
+        logging.warning(f"Truncating torn record at byte {good_offset} of {path}")
+        with open(path, "r+b") as f:
+            f.truncate(good_offset)
+
+    def encode(self, message):
+        """Return the record stored for a message, moving big content to a blob."""
+        content = message.get("content")
+        if not content or (
+            message.get("role") != "system" and len(content) < self.BLOB_MIN_SIZE
+        ):
+            return message
+        record = {k: v for k, v in message.items() if k != "content"}
+        record["blob"] = self.put_blob(content)
+        return record
+
+    def decode(self, record):
+        """Return the message for a stored record, resolving blob references."""
+        digest = record.pop("blob", None)
+        if digest is not None:
+            record["content"] = self.get_blob(digest)
+        return record
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_directory, digest)
+
+    def put_blob(self, content):
+        """Store content once under its SHA-256 and return the digest."""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if digest not in self.blob_cache:
+            if not os.path.exists(self.blob_path(digest)):
+                os.makedirs(self.blob_directory, exist_ok=True)
+                self.write_atomic(self.blob_path(digest), content)
+            self.cache_blob(digest, content)
+        return digest
+
+    def get_blob(self, digest):
+        content = self.blob_cache.get(digest)
+        if content is None:
+            try:
+                with open(self.blob_path(digest), "r", encoding="utf-8") as f:
+                    content = f.read()
+            except OSError as e:
+                logging.error(f"Missing chat blob {digest}: {e}")
+                return ""
+            self.cache_blob(digest, content)
+        return content
+
+    def cache_blob(self, digest, content):
+        # System prompts are shared by every chat; keep those in memory.
+        if len(content) < self.BLOB_MIN_SIZE:
+            self.blob_cache[digest] = content
+
+    def load_summary(self, chat):
+        """Return the rolling summary of a chat, or None."""
+        try:
+            with open(self.summary_path(chat), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save_summary(self, chat, summary):
+        """Atomically replace the rolling summary of a chat."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.write_atomic(self.summary_path(chat), json.dumps(summary))
+
+    def rename(self, old_chat, new_chat):
+        """Rename a chat without copying its contents."""
+        with self.lock:
+            if not os.path.exists(self.path(old_chat)) and old_chat in self.archive:
+                self.archive.rename(old_chat, new_chat)
+            else:
+                refs = self.live_blob_refs().get(old_chat)
+                self.set_blob_refs(new_chat, refs)
+                os.replace(self.path(old_chat), self.path(new_chat))
+                self.set_blob_refs(old_chat, None)
+            if os.path.exists(self.summary_path(old_chat)):
+                os.replace(self.summary_path(old_chat), self.summary_path(new_chat))
+
+    def delete(self, chat):
+        """Delete a chat and its summary if they exist, and unused blobs."""
+        with self.lock:
+            for path in (self.path(chat), self.summary_path(chat)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.archive.remove(chat)
+            self.set_blob_refs(chat, None)
+            self.collect_blobs()
+
+    def restore(self, chat):
+        """Move an archived chat back to a live file."""
+        with self.lock:
+            self.set_blob_refs(chat, self.archive.info(chat).get("blobs"))
+            self.write_atomic(self.path(chat), self.archive.read(chat))
+            self.archive.remove(chat)
+
+    def compact(self, archive_after):
+        """Move blobs out of old chat files and archive chats idle past archive_after.
+
+        archive_after is in seconds. Meant to run on a background thread.
+        """
+        cutoff = time.time() - archive_after
+        live = [c for c in self.list_chats() if os.path.exists(self.path(c))]
+        archived = 0
+        for chat in live:
+            with self.lock:
+                try:
+                    mtime = os.stat(self.path(chat)).st_mtime
+                    if mtime < cutoff:
+                        self.archive_chat(chat, mtime)
+                        archived += 1
+                    elif self.has_inline_system_prompt(chat):
+                        self.rewrite(chat, mtime)
+                except (OSError, ValueError) as e:
+                    logging.error(f"Error compacting chat {chat}: {e}")
+        with self.lock:
+            live = {c for c in live if os.path.exists(self.path(c))}
+            self.archive.compact(live_files=live)
+        return archived
+
+    def has_inline_system_prompt(self, chat):
+        """Return True if a chat file predates blob references."""
+        with open(self.path(chat), "rb") as f:
+            f.readline()
+            first = f.readline()
+        if not first.endswith(b"\n"):
+            return False
+        record = json.loads(first)
+        return record.get("role") == "system" and "content" in record
+
+    def rewrite(self, chat, mtime):
+        """Rewrite a chat file in the current format, keeping its mtime."""
+        data = self.serialize(self.load(chat))
+        self.add_blob_refs(chat, self.blob_refs(data))
+        self.write_atomic(self.path(chat), data)
+        os.utime(self.path(chat), (mtime, mtime))
+
+    def archive_chat(self, chat, mtime):
+        """Move a live chat into the archive."""
+        messages = self.load(chat)
+        data = self.serialize(messages)
+        self.archive.add(chat, data, len(messages), mtime, self.blob_refs(data))
+        os.remove(self.path(chat))
+        self.set_blob_refs(chat, None)
+
+    @staticmethod
+    def blob_refs(data):
+        """Return the blob digests referenced by serialized chat data."""
+        return sorted(
+            {
+                json.loads(line)["blob"]
+                for line in data.splitlines()
+                if '"blob"' in line
+            }
+        )
+
+    def live_blob_refs(self):
+        """Return {chat: digests} for live chats, rebuilding it if missing."""
+        if self.refs is None:
+            try:
+                with open(self.refs_path, "r", encoding="utf-8") as f:
+                    self.refs = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.refs = self.scan_blob_refs()
+                self.save_blob_refs()
+        return self.refs
+
+    def scan_blob_refs(self):
+        """Read the blob references of every live chat file."""
+        refs = {}
+        for chat in self.list_chats():
+            try:
+                with open(self.path(chat), "r", encoding="utf-8") as f:
+                    digests = self.blob_refs(f.read())
+            except FileNotFoundError:
+                continue
+            if digests:
+                refs[chat] = digests
+        return refs
+
+    def save_blob_refs(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.write_atomic(self.refs_path, json.dumps(self.refs))
+
+    def set_blob_refs(self, chat, digests):
+        """Record the blobs a live chat refers to; None or empty forgets it.
+
+        Called before a chat file gains references and after it loses them.
+        """
+        refs = self.live_blob_refs()
+        digests = sorted(digests) if digests else None
+        if refs.get(chat) == digests:
+            return
+        if digests:
+            refs[chat] = digests
+        else:
+            del refs[chat]
+        self.save_blob_refs()
+
+    def add_blob_refs(self, chat, digests):
+        """Record further blobs a live chat refers to."""
+        known = self.live_blob_refs().get(chat, [])
+        if not set(digests) <= set(known):
+            self.set_blob_refs(chat, set(known) | set(digests))
+
+    def collect_blobs(self):
+        """Delete blobs no live or archived chat refers to any more."""
+        if not os.path.isdir(self.blob_directory):
+            return
+        referenced = self.archive.blob_refs()
+        for digests in self.live_blob_refs().values():
+            referenced.update(digests)
+        for digest in os.listdir(self.blob_directory):
+            if digest not in referenced and not digest.endswith(".tmp"):
+                os.remove(self.blob_path(digest))
+                self.blob_cache.pop(digest, None)
+
+    def migrate_legacy(self):
+        """Convert legacy ``<chat>.json`` array files to the line-delimited format."""
+        if not os.path.isdir(self.directory):
+            return 0
+        migrated = 0
+        for filename in os.listdir(self.directory):
+            if not self.is_legacy_log(filename):
+                continue
+            chat = filename[: -len(self.LEGACY_EXTENSION)]
+            legacy_path = os.path.join(self.directory, filename)
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    messages = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.error(f"Skipping unreadable legacy chat log {filename}: {e}")
+                continue
+            if not isinstance(messages, list):
+                messages = [messages]
+            if not self.exists(chat):
+                self.create(chat, messages)
+            os.remove(legacy_path)
+            migrated += 1
+        return migrated
+
+    def is_legacy_log(self, filename):
+        """Return True for legacy chat logs, skipping index and summary files."""
+        return (
+            filename.endswith(self.LEGACY_EXTENSION)
+            and not filename.endswith(self.SUMMARY_EXTENSION)
+            and not filename.startswith(".")
+        )
+
+    @staticmethod
+    def write_atomic(path, data):
+        """Write data to path via a temporary file and os.replace."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class ChatArchive:
+    """Compressed zip segments holding the files of idle chats.
+
+    ``manifest.json`` maps each archived chat to its segment member, message
+    count, last-modified time and referenced blobs. New chats go into the
+    newest segment until it reaches SEGMENT_MAX_BYTES. Members of chats that
+    were restored or deleted stay behind until compact() rewrites the segment.
+    """
+
+    MANIFEST = "manifest.json"
+    SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, self.MANIFEST)
+        self.lock = threading.RLock()
+        self.entries = None
+        self.next_member = 0
+
+    def load(self):
+        """Read the manifest on first use."""
+        if self.entries is not None:
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data["chats"]
+            self.next_member = data["next_member"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            self.entries = {}
+
+    def save(self):
+        data = {"chats": self.entries, "next_member": self.next_member}
+        ChatStore.write_atomic(self.manifest_path, json.dumps(data))
+
+    def __contains__(self, chat):
+        with self.lock:
+            self.load()
+            return chat in self.entries
+
+    def chats(self):
+        with self.lock:
+            self.load()
+            return list(self.entries)
+
+    def info(self, chat):
+        """Return the manifest entry of an archived chat, or None."""
+        with self.lock:
+            self.load()
+            return self.entries.get(chat)
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, segment)
+
+    def current_segment(self):
+        """Return the segment new chats are added to."""
+        segments = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(".zip")
+        )
+        if segments:
+            last = segments[-1]
+            if os.path.getsize(self.segment_path(last)) < self.SEGMENT_MAX_BYTES:
+                return last
+            number = int(last[len("segment-") : -len(".zip")]) + 1
+        else:
+            number = 1
+        return f"segment-{number:06d}.zip"
+
+    def add(self, chat, data, count, mtime, blobs=()):
+        """Compress a chat's file contents into the current segment.
+
+        The member is appended to a copy of the segment, which then replaces
+        it, so a crash never leaves a segment with a torn central directory.
+        """
+        with self.lock:
+            self.load()
+            os.makedirs(self.directory, exist_ok=True)
+            segment = self.current_segment()
+            member = f"{self.next_member}.jsonl"
+            self.next_member += 1
+            path = self.segment_path(segment)
+            tmp_path = f"{path}.tmp"
+            if os.path.exists(path):
+                shutil.copyfile(path, tmp_path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)  # left behind by a crash
+            with zipfile.ZipFile(
+                tmp_path, "a", zipfile.ZIP_DEFLATED, compresslevel=9
+            ) as archive:
+                archive.writestr(member, data)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self.entries[chat] = {
+                "segment": segment,
+                "member": member,
+                "count": count,
+                "mtime": mtime,
+                "blobs": list(blobs),
+            }
+            self.save()
+
+    def read(self, chat):
+        """Return the decompressed file contents of an archived chat."""
+        with self.lock:
+            self.load()
+            entry = self.entries[chat]
+            with zipfile.ZipFile(self.segment_path(entry["segment"])) as archive:
+                return archive.read(entry["member"]).decode("utf-8")
+
+    def remove(self, chat):
+        with self.lock:
+            self.load()
+            if self.entries.pop(chat, None) is not None:
+                self.save()
+
+    def rename(self, old_chat, new_chat):
+        with self.lock:
+            self.load()
+            self.entries[new_chat] = self.entries.pop(old_chat)
+            self.save()
+
+    def blob_refs(self):
+        with self.lock:
+            self.load()
+            return {digest for e in self.entries.values() for digest in e["blobs"]}
+
+    def compact(self, live_files=()):
+        """Drop entries shadowed by live files and rewrite segments with dead members."""
+        with self.lock:
+            self.load()
+            if not os.path.isdir(self.directory):
+                return
+            # A crash between archiving and deleting the live file leaves both.
+            shadowed = [chat for chat in self.entries if chat in live_files]
+            for chat in shadowed:
+                del self.entries[chat]
+            live_members = {}
+            for entry in self.entries.values():
+                live_members.setdefault(entry["segment"], set()).add(entry["member"])
+            for segment in os.listdir(self.directory):
+                if segment.endswith(".zip"):
+                    self.compact_segment(segment, live_members.get(segment, set()))
+            self.save()
+
+    def compact_segment(self, segment, members):
+        """Rewrite a segment if at least half of its bytes are dead."""
+        path = self.segment_path(segment)
+        if not members:
+            os.remove(path)
+            return
+        with zipfile.ZipFile(path) as archive:
+            infos = archive.infolist()
+            dead = sum(i.compress_size for i in infos if i.filename not in members)
+            if dead * 2 < sum(i.compress_size for i in infos):
+                return
+            tmp_path = f"{path}.tmp"
+            with zipfile.ZipFile(
+                tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=9
+            ) as compacted:
+                for info in infos:
+                    if info.filename in members:
+                        compacted.writestr(info, archive.read(info))
+        os.replace(tmp_path, path)
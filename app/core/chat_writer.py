@@ -0,0 +1,122 @@
+import logging
+import queue
+import threading
+import time
+
+from app.core.chat_store import DURABILITY_LEVELS
+from app.llm.config import PERSIST_COALESCE_WINDOW, PERSIST_DURABILITY
+
+
+class ChatWriter:
+    """Persist chat changes from a background thread.
+
+    Callers only enqueue work. The writer gathers everything queued within a
+    short window, appends each chat's new messages with a single write, keeps
+    only the latest summary per chat, and runs renames, deletes and other
+    calls in submission order after the writes queued before them.
+    """
+
+    def __init__(
+        self,
+        store,
+        durability=PERSIST_DURABILITY,
+        window=PERSIST_COALESCE_WINDOW,
+        on_appended=None,
+    ):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability {durability!r}")
+        self.store = store
+        self.durability = durability
+        self.window = window
+        self.on_appended = on_appended
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(
+            target=self.run, name="chat-writer", daemon=True
+        )
+        self.thread.start()
+
+    def append(self, chat, message, initial_messages=()):
+        """Queue a message to append, creating the chat if needed."""
+        self.queue.put(("append", chat, message, list(initial_messages)))
+
+    def save_summary(self, chat, summary):
+        """Queue a chat's rolling summary to be replaced atomically."""
+        self.queue.put(("summary", chat, summary))
+
+    def call(self, func, *args):
+        """Queue func(*args) to run after the writes queued before it."""
+        self.queue.put(("call", func, args))
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put(("stop",))
+            self.thread.join()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while batch[-1][0] in ("append", "summary", "call"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if not self.process(batch):
+                return
+
+    def process(self, batch):
+        """Apply a batch; return False once a stop request has been handled."""
+        appends, summaries = {}, {}
+        for item in batch:
+            kind = item[0]
+            if kind == "append":
+                _, chat, message, initial_messages = item
+                appends.setdefault(chat, (initial_messages, []))[1].append(message)
+                continue
+            if kind == "summary":
+                summaries[item[1]] = item[2]
+                continue
+            self.write(appends, summaries)
+            appends, summaries = {}, {}
+            if kind == "call":
+                _, func, args = item
+                try:
+                    func(*args)
+                except Exception as e:
+                    logging.error(f"Error in queued chat operation: {e}")
+            elif kind == "flush":
+                item[1].set()
+            elif kind == "stop":
+                return False
+        self.write(appends, summaries)
+        return True
+
+    def write(self, appends, summaries):
+        for chat, (initial_messages, messages) in appends.items():
+            try:
+                written = self.store.append_many(
+                    chat, messages, initial_messages, self.durability
+                )
+            except OSError as e:
+                logging.error(f"Error saving chat history for {chat}: {e}")
+                continue
+            if self.on_appended is not None:
+                try:
+                    self.on_appended(chat, written)
+                except Exception as e:
+                    logging.error(f"Error indexing messages for {chat}: {e}")
+        for chat, summary in summaries.items():
+            try:
+                self.store.save_summary(chat, summary)
+            except OSError as e:
+                logging.error(f"Error saving chat summary for {chat}: {e}")
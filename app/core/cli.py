@@ -0,0 +1,164 @@
+"""Headless batch mode: run JSONL prompts through process_message without Qt.
+
+Each input line is a JSON object such as
+``{"id": "q1", "prompt": "V=1 What is DNS?", "model": "gpt-4o"}``; a bare JSON
+string is taken as the prompt. ``history`` may carry earlier messages. Results
+are written as JSONL in completion order, one line per prompt; a line that is
+not valid JSON gets a failed result and the batch goes on.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from app.llm.config import AUTO_MODEL, DEFAULT_MODEL
+from app.llm.message import ChatHistory
+from app.llm.process_message import process_message
+
+
+def read_prompts(paths):
+    """Yield (id, item) pairs from JSONL files or stdin.
+
+    item is a ValueError for a line that cannot be read as a prompt.
+    """
+    sources = paths or ["-"]
+    for path in sources:
+        f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+        try:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                location = f"{path}:{line_number}"
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield location, ValueError(f"Invalid JSON: {e}")
+                    continue
+                if isinstance(item, str):
+                    item = {"prompt": item}
+                if not isinstance(item, dict):
+                    yield location, ValueError("Expected an object or a string")
+                    continue
+                yield str(item.get("id", location)), item
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def completed_ids(path):
+    """Return the ids already answered successfully in an output file."""
+    done = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("ok"):
+                    done.add(str(record["id"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run_item(item_id, item, default_model):
+    """Answer one prompt and return its result record."""
+    started = time.monotonic()
+    model, ans, model_used, error = default_model, None, None, None
+    try:
+        if isinstance(item, ValueError):
+            raise item
+        model = item.get("model", default_model)
+        chat_log = ChatHistory.from_dicts(item.get("history", []))
+        ans, url, chat_log, model_used, response_json = process_message(
+            item["prompt"], chat_log, model
+        )
+        if model_used is None:
+            error = ans  # the request failed and ans is the message for the user
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    record = {
+        "id": item_id,
+        "model": model_used or model,
+        "response": ans,
+        "latency": round(time.monotonic() - started, 3),
+        "ok": error is None,
+    }
+    if error:
+        record["error"] = error
+    return record
+
+
+def run_batch(prompts, output, concurrency, default_model, skip=()):
+    """Run prompts with bounded concurrency, writing results as they finish."""
+    written = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = set()
+        try:
+            for item_id, item in prompts:
+                if item_id in skip:
+                    continue
+                if len(in_flight) >= concurrency * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    written += write_results(done, output)
+                in_flight.add(executor.submit(run_item, item_id, item, default_model))
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                written += write_results(done, output)
+        except KeyboardInterrupt:
+            # Keep every answer already paid for, so --resume skips it.
+            running = [f for f in in_flight if not f.cancel()]
+            write_results(wait(running).done, output)
+            raise
+    return written
+
+
+def write_results(futures, output):
+    for future in futures:
+        output.write(json.dumps(future.result(), ensure_ascii=False) + "\n")
+    output.flush()
+    return len(futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", help="JSONL prompt files (default: stdin)")
+    parser.add_argument("-o", "--output", help="JSONL results file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument(
+        "-m", "--model", default=DEFAULT_MODEL, help=f'a model or "{AUTO_MODEL}"'
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip prompts already answered in the output file",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    skip = completed_ids(args.output) if args.resume and args.output else set()
+    mode = "a" if args.resume else "w"
+    output = open(args.output, mode, encoding="utf-8") if args.output else sys.stdout
+    started = time.monotonic()
+    try:
+        written = run_batch(
+            read_prompts(args.inputs), output, args.concurrency, args.model, skip
+        )
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with --resume to continue.", file=sys.stderr)
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.monotonic() - started
+    print(f"{written} prompts in {elapsed:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
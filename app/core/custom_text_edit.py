@@ -5,6 +5,7 @@ from PyQt5.QtGui import QFontMetrics
 
 class CustomTextEdit(QTextEdit):
     returnPressed = pyqtSignal()
+    focused = pyqtSignal()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -25,6 +26,10 @@ class CustomTextEdit(QTextEdit):
         else:
             super().keyPressEvent(event)
 
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.focused.emit()
+
     def toggle_scrollbar(self):
         lines = self.document().blockCount()
         self.setVerticalScrollBarPolicy(
@@ -0,0 +1,165 @@
+"""Backend daemon: serve LLM requests to UI windows and the CLI over a Unix socket.
+
+Every client shares one LLMEngine, so all windows and scripts use the same
+connection pool, response cache and concurrency limit, and HTTP and JSON
+parsing happen outside the GUI process. Start it with
+``python3 -m app.core.daemon``; clients with ``OPAL_DAEMON=1`` also start it
+on demand.
+
+The protocol is newline-delimited JSON with one request per connection:
+
+- ``{"op": "ask", "model": ..., "messages": [...]}`` is answered with
+  ``{"answer": ..., "url": ..., "model": ..., "response": ...}``
+- ``{"op": "stream", ...}`` is answered with one ``{"delta": ...}`` line per
+  delta and a final ``{"done": true}``
+- ``{"op": "warm_up", "model": ...}`` and ``{"op": "metrics"}``
+
+Closing the connection cancels the request. Only one daemon serves a socket:
+it holds an exclusive lock on ``<socket>.lock`` for as long as it runs, and
+both ends refuse peers running as another user.
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import signal
+import sys
+
+from app.llm.async_engine import LLMEngine
+from app.llm.config import DAEMON_MAX_LINE, DAEMON_SOCKET, LOG_LEVEL, METRICS_PORT
+from app.llm.daemon_client import peer_uid
+from app.llm.telemetry import start_metrics_server, telemetry
+
+
+class Daemon:
+    def __init__(self, path=DAEMON_SOCKET):
+        self.path = path
+        self.engine = LLMEngine()
+
+    async def handle(self, reader, writer):
+        """Serve one request, cancelling it if the client disconnects."""
+        task = closed = None
+        try:
+            if peer_uid(writer.get_extra_info("socket")) != os.getuid():
+                logging.warning("Refused a connection from another user")
+                return
+            line = await reader.readline()
+            if not line:
+                return
+            task = asyncio.ensure_future(self.serve(json.loads(line), writer))
+            closed = asyncio.ensure_future(reader.read())
+            await asyncio.wait({task, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                task.cancel()
+            await task
+        except (asyncio.CancelledError, ConnectionError):
+            pass  # the client disconnected or the daemon is stopping
+        except (ValueError, KeyError) as e:
+            logging.error(f"Error serving request: {e}")
+        finally:
+            if closed is not None:
+                closed.cancel()
+            writer.close()
+
+    async def serve(self, request, writer):
+        op, model = request.get("op"), request.get("model")
+        if op == "ask":
+            ans, url, model_used, res = await self.engine.ask_llm(
+                request["messages"], model
+            )
+            response = res.model_dump() if res is not None else None
+            await send(
+                writer,
+                {"answer": ans, "url": url, "model": model_used, "response": response},
+            )
+        elif op == "stream":
+            stream = self.engine.ask_llm_stream(request["messages"], model)
+            try:
+                async for delta in stream:
+                    await send(writer, {"delta": delta})
+            finally:
+                # Release the upstream request at once if the client went away.
+                await stream.aclose()
+            await send(writer, {"done": True})
+        elif op == "warm_up":
+            await self.engine.warm_up(model)
+            await send(writer, {"done": True})
+        elif op == "metrics":
+            await send(writer, {"metrics": telemetry.summary()})
+        else:
+            await send(writer, {"error": f"Unknown op: {op}"})
+
+    async def run(self):
+        server = await asyncio.start_unix_server(
+            self.handle, self.path, limit=DAEMON_MAX_LINE
+        )
+        os.chmod(self.path, 0o600)
+        logging.info(f"Serving on {self.path}")
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            await stop.wait()
+        await self.engine.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def send(writer, message):
+    writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+def secure_directory(path):
+    """Create the socket's directory if needed and check only we can use it."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{directory} must be owned by you with mode 0700")
+
+
+def acquire_lock(path):
+    """Return an open file holding the daemon lock for path, or None if taken.
+
+    The lock is released when the process exits, however it exits.
+    """
+    lock = open(path + ".lock", "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=DAEMON_SOCKET)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=LOG_LEVEL)
+
+    try:
+        secure_directory(args.socket)
+    except PermissionError as e:
+        print(e, file=sys.stderr)
+        return 1
+    lock = acquire_lock(args.socket)
+    if lock is None:
+        print(f"A daemon is already serving {args.socket}", file=sys.stderr)
+        return 1
+    if os.path.exists(args.socket):
+        os.remove(args.socket)  # left behind by a daemon that crashed
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    with lock:
+        asyncio.run(Daemon(args.socket).run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from app.llm.config import STREAM_BATCH_INTERVAL
+
+
+class DeltaBatcher:
+    """Collect streamed deltas and release them in batches on a time window.
+
+    Deltas held back by the window are flushed by a timer on the running event
+    loop when it expires, so a stream that pauses never leaves text waiting.
+    """
+
+    def __init__(self, emit, interval=STREAM_BATCH_INTERVAL):
+        self.emit = emit
+        self.interval = interval
+        self.pending = []
+        self.last_flush = None
+        self.timer = None
+
+    def add(self, delta):
+        """Queue a delta, flushing if the window has elapsed."""
+        self.pending.append(delta)
+        now = time.monotonic()
+        # The first delta goes out immediately to keep time-to-first-token low.
+        if self.last_flush is None or now - self.last_flush >= self.interval:
+            self.flush(now)
+        elif self.timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            delay = self.last_flush + self.interval - now
+            self.timer = loop.call_later(delay, self.flush)
+
+    def flush(self, now=None):
+        """Emit everything queued so far."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.pending:
+            self.emit("".join(self.pending))
+            self.pending = []
+        self.last_flush = now if now is not None else time.monotonic()
@@ -1,10 +1,57 @@
-from PyQt5.QtWidgets import QApplication
-from app.ui.main_window import OpalApp
+import asyncio
+import logging
+import sys
 
-if __name__ == "__main__":
-    import sys
+from app.core.startup_profile import startup_profile
+
+# Modules whose import cost --profile-startup breaks down: the startup path
+# and the LLM stack that is deferred until after the first paint.
+PROFILED_MODULES = ("app.ui.main_window", "app.llm.process_message")
+
+
+def main(argv):
+    profile = "--profile-startup" in argv
+    if profile:
+        startup_profile.enable()
+        argv = [arg for arg in argv if arg != "--profile-startup"]
+
+    from app.llm.config import LOG_LEVEL, METRICS_PORT
+
+    logging.basicConfig(level=LOG_LEVEL)
+    startup_profile.mark("config loaded")
+    import qasync
+    from PyQt5.QtWidgets import QApplication
+
+    startup_profile.mark("Qt imported")
+    from app.ui.main_window import OpalApp
 
-    app = QApplication(sys.argv)
+    startup_profile.mark("main window imported")
+    if METRICS_PORT:
+        from app.llm.telemetry import start_metrics_server
+
+        start_metrics_server(METRICS_PORT)
+    app = QApplication(argv)
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    startup_profile.mark("QApplication created")
     opal = OpalApp()
+    startup_profile.mark("window created")
+    if profile:
+        opal.started.connect(lambda: report_startup(app))
     opal.show()
-    app.exec_()
+    with loop:
+        loop.run_forever()
+        # The async engine is only imported once a request has been sent.
+        engine_module = sys.modules.get("app.llm.async_engine")
+        if engine_module is not None:
+            loop.run_until_complete(engine_module.engine.close())
+
+
+def report_startup(app):
+    """Print the --profile-startup report and exit."""
+    startup_profile.report(PROFILED_MODULES)
+    app.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
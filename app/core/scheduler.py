@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import logging
+from collections import deque
+
+from app.llm.config import SCHEDULER_MAX_WORKERS
+
+
+class ChatScheduler:
+    """Run chat requests with a FIFO queue per chat and a global worker cap.
+
+    A chat has at most one request in flight, so follow-ups see the previous
+    reply. When a worker frees up, the active chat goes first, then the chat
+    whose next request has waited longest.
+    """
+
+    def __init__(self, max_workers=SCHEDULER_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.queues = {}
+        self.running = {}
+        self.active_chat = None
+        self.sequence = itertools.count()
+
+    def submit(self, chat, job):
+        """Queue a coroutine function to run for a chat."""
+        self.queues.setdefault(chat, deque()).append((next(self.sequence), job))
+        self.dispatch()
+
+    def set_active(self, chat):
+        """Give a chat priority over background chats."""
+        self.active_chat = chat
+        self.dispatch()
+
+    def pending(self, chat=None):
+        """Return the number of queued requests, for one chat or overall."""
+        if chat is not None:
+            return len(self.queues.get(chat, ()))
+        return sum(len(queue) for queue in self.queues.values())
+
+    def is_busy(self):
+        """Return True while any request is queued or running."""
+        return bool(self.running) or self.pending() > 0
+
+    def next_chat(self):
+        """Return the ready chat that should run next, or None."""
+        ready = [
+            chat
+            for chat, queue in self.queues.items()
+            if queue and chat not in self.running
+        ]
+        if not ready:
+            return None
+        return min(
+            ready,
+            key=lambda chat: (chat != self.active_chat, self.queues[chat][0][0]),
+        )
+
+    def dispatch(self):
+        """Start queued requests while workers are free."""
+        while len(self.running) < self.max_workers:
+            chat = self.next_chat()
+            if chat is None:
+                return
+            _, job = self.queues[chat].popleft()
+            if not self.queues[chat]:
+                del self.queues[chat]
+            self.running[chat] = asyncio.ensure_future(self.run(chat, job))
+
+    async def run(self, chat, job):
+        try:
+            await job()
+        except Exception as e:
+            logging.error(f"Error running request for {chat}: {e}")
+        finally:
+            for name, task in list(self.running.items()):
+                if task is asyncio.current_task():
+                    del self.running[name]
+            self.dispatch()
+
+    def rename(self, old_chat, new_chat):
+        """Move queued and running requests to a renamed chat."""
+        if old_chat in self.queues:
+            self.queues.setdefault(new_chat, deque()).extend(
+                self.queues.pop(old_chat)
+            )
+        if old_chat in self.running:
+            self.running[new_chat] = self.running.pop(old_chat)
+        if self.active_chat == old_chat:
+            self.active_chat = new_chat
@@ -0,0 +1,292 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from app.llm.config import RECALL_ENABLED, RECALL_MIN_SCORE
+
+SNIPPET_TOKENS = 12
+EMBED_CHUNK = 256  # messages embedded per batch while catching up
+INSERT_CHUNK = 256  # messages inserted per lock hold during backfill
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching all words, the last as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """Full-text index over all chat messages backed by SQLite FTS5.
+
+    Every stored message has a position: its index in the chat's message list
+    as returned by ChatStore.load. System messages take up a position but are
+    not indexed.
+
+    With numpy installed, every indexed message is also embedded into a
+    VectorIndex under its rowid, which recall searches by cosine similarity.
+    ``embedded`` is the highest rowid that has a vector. Embeddings are
+    computed in batches outside the lock, so search and recall on the GUI
+    thread never wait for more than one batch to be stored.
+    """
+
+    FILENAME = ".search.db"
+
+    def __init__(self, directory):
+        self.lock = threading.Lock()
+        self.embed_lock = threading.Lock()  # one catch_up at a time
+        self.generation = 0  # bumped whenever vectors are cleared
+        self.ready = threading.Event()
+        self.pending = []
+        self.directory = directory
+        self.vectors = None
+        self.embedded = 0
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(
+            os.path.join(directory, self.FILENAME), check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+            "content, chat UNINDEXED, role UNINDEXED, position UNINDEXED)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS indexed_chats ("
+            "chat TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS vector_state ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), "
+            "dimensions INTEGER NOT NULL, embedded INTEGER NOT NULL)"
+        )
+        self.db.commit()
+
+    def indexed_count(self, chat):
+        """Return how many messages of a chat have been indexed."""
+        row = self.db.execute(
+            "SELECT count FROM indexed_chats WHERE chat = ?", (chat,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def add_messages(self, chat, messages):
+        """Index messages appended to a chat, queueing them during backfill."""
+        if not self.ready.is_set():
+            with self.lock:
+                if not self.ready.is_set():
+                    self.pending.append((chat, list(messages)))
+                    return
+        with self.lock:
+            self.insert(chat, messages)
+            self.db.commit()
+        self.catch_up()
+
+    def insert(self, chat, messages):
+        """Insert messages after the ones already indexed for a chat."""
+        position = self.indexed_count(chat)
+        rows = []
+        for message in messages:
+            if message.get("role") != "system" and message.get("content"):
+                rows.append((message["content"], chat, message["role"], position))
+            position += 1
+        self.db.executemany(
+            "INSERT INTO messages (content, chat, role, position) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self.db.execute(
+            "INSERT OR REPLACE INTO indexed_chats (chat, count) VALUES (?, ?)",
+            (chat, position),
+        )
+
+    def open_vectors(self):
+        """Open the recall vectors and embed messages indexed without them."""
+        if not RECALL_ENABLED:
+            return
+        try:
+            from app.core.vector_index import VectorIndex
+        except ImportError:
+            logging.warning("numpy is not installed, recall is disabled")
+            return
+        with self.lock:
+            vectors = VectorIndex(self.directory)
+            state = self.db.execute(
+                "SELECT dimensions, embedded FROM vector_state"
+            ).fetchone()
+            if state is None or state[0] != vectors.dimensions:
+                vectors.reset()
+                state = (vectors.dimensions, 0)
+            self.vectors = vectors
+            self.embedded = state[1]
+            self.rewind_vectors()
+            vectors.rows = self.embedded + 1
+        self.catch_up()
+
+    def catch_up(self):
+        """Embed messages with a rowid past the last embedded one.
+
+        Each batch of EMBED_CHUNK messages is read and stored under the lock
+        but embedded without it. A batch is redone if vectors were cleared or
+        rewound meanwhile.
+        """
+        with self.embed_lock:
+            while True:
+                with self.lock:
+                    vectors, start = self.vectors, self.embedded
+                    generation = self.generation
+                    if vectors is None:
+                        return
+                    rows = self.db.execute(
+                        "SELECT rowid, content FROM messages WHERE rowid > ? "
+                        "ORDER BY rowid LIMIT ?",
+                        (start, EMBED_CHUNK),
+                    ).fetchall()
+                if not rows:
+                    return
+                embedded = [vectors.embed(content) for _, content in rows]
+                with self.lock:
+                    if self.embedded != start or self.generation != generation:
+                        continue
+                    for (rowid, _), vector in zip(rows, embedded):
+                        vectors.put(rowid, vector)
+                    self.embedded = rows[-1][0]
+                    self.save_vector_state()
+                    self.db.commit()
+                if len(rows) < EMBED_CHUNK:
+                    return
+
+    def save_vector_state(self):
+        self.vectors.flush()
+        self.db.execute(
+            "INSERT OR REPLACE INTO vector_state (id, dimensions, embedded) "
+            "VALUES (0, ?, ?)",
+            (self.vectors.dimensions, self.embedded),
+        )
+
+    def clear_vectors(self, chat):
+        """Zero the vectors of a chat's messages before they are deleted."""
+        if self.vectors is not None:
+            rowids = self.db.execute(
+                "SELECT rowid FROM messages WHERE chat = ?", (chat,)
+            ).fetchall()
+            self.vectors.clear([rowid for (rowid,) in rowids])
+            self.generation += 1
+
+    def rewind_vectors(self):
+        """Step back past deleted rows, whose rowids SQLite may hand out again."""
+        top = self.db.execute("SELECT max(rowid) FROM messages").fetchone()[0] or 0
+        if top < self.embedded:
+            self.embedded = top
+            if self.vectors is not None:
+                self.vectors.rows = top + 1
+                self.save_vector_state()
+
+    def backfill(self, store, counts):
+        """Index stored messages missing from the index.
+
+        counts maps chat names to the number of messages on disk when the app
+        started; anything appended later arrives through add_messages.
+        """
+        try:
+            self.open_vectors()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logging.error(f"Error opening recall vectors: {e}")
+            self.vectors = None
+        try:
+            for chat, count in counts.items():
+                with self.lock:
+                    indexed = self.indexed_count(chat)
+                if indexed >= count:
+                    continue
+                try:
+                    messages = store.load(chat)[indexed:count]
+                except (OSError, ValueError) as e:
+                    logging.error(f"Error indexing chat {chat}: {e}")
+                    continue
+                # Release the lock between chunks so search and recall get in.
+                for start in range(0, len(messages), INSERT_CHUNK):
+                    with self.lock:
+                        self.insert(chat, messages[start : start + INSERT_CHUNK])
+                        self.db.commit()
+                self.catch_up()
+        finally:
+            with self.lock:
+                for chat, messages in self.pending:
+                    self.insert(chat, messages)
+                self.db.commit()
+                self.pending = []
+                self.ready.set()
+        self.catch_up()
+
+    def recall(self, text, limit):
+        """Return (chat, position, role, content) of the most similar messages."""
+        if self.vectors is None:
+            return []
+        with self.lock:
+            hits = [
+                row
+                for row, score in self.vectors.search(text, limit)
+                if score >= RECALL_MIN_SCORE
+            ]
+            if not hits:
+                return []
+            found = {
+                row[0]: row[1:]
+                for row in self.db.execute(
+                    "SELECT rowid, chat, position, role, content FROM messages "
+                    f"WHERE rowid IN ({','.join('?' * len(hits))})",
+                    hits,
+                )
+            }
+        return [found[row] for row in hits if row in found]
+
+    def start_backfill(self, store, counts):
+        """Run backfill on a background thread."""
+        threading.Thread(
+            target=self.backfill, args=(store, dict(counts)), daemon=True
+        ).start()
+
+    def search(self, text, limit=50):
+        """Return (chat, position, role, snippet) tuples ranked by relevance."""
+        query = fts_query(text)
+        if query is None:
+            return []
+        with self.lock:
+            try:
+                return self.db.execute(
+                    "SELECT chat, position, role, "
+                    f"snippet(messages, 0, '[', ']', '...', {SNIPPET_TOKENS}) "
+                    "FROM messages WHERE messages MATCH ? ORDER BY rank LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                logging.error(f"Search error: {e}")
+                return []
+
+    def rename(self, old_chat, new_chat):
+        """Move indexed messages to a renamed chat."""
+        with self.lock:
+            self.clear_vectors(new_chat)
+            self.db.execute("DELETE FROM messages WHERE chat = ?", (new_chat,))
+            self.db.execute("DELETE FROM indexed_chats WHERE chat = ?", (new_chat,))
+            self.rewind_vectors()
+            self.db.execute(
+                "UPDATE messages SET chat = ? WHERE chat = ?", (new_chat, old_chat)
+            )
+            self.db.execute(
+                "UPDATE indexed_chats SET chat = ? WHERE chat = ?",
+                (new_chat, old_chat),
+            )
+            self.db.commit()
+
+    def delete(self, chat):
+        """Remove a chat from the index."""
+        with self.lock:
+            self.clear_vectors(chat)
+            self.db.execute("DELETE FROM messages WHERE chat = ?", (chat,))
+            self.db.execute("DELETE FROM indexed_chats WHERE chat = ?", (chat,))
+            self.rewind_vectors()
+            self.db.commit()
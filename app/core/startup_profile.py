@@ -0,0 +1,68 @@
+"""Startup timings for ``python3 -m app.core.run --profile-startup``."""
+
+import subprocess
+import sys
+import time
+
+
+class StartupProfile:
+    """Collect named checkpoints measured from process start-up."""
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.marks = []
+
+    def enable(self):
+        self.enabled = True
+
+    def mark(self, label):
+        """Record the time elapsed until label, when profiling is enabled."""
+        if self.enabled:
+            self.marks.append((label, time.perf_counter() - self.started))
+
+    def report(self, modules=(), limit=15, file=sys.stderr):
+        """Print the checkpoints and the slowest imports of modules."""
+        print("Startup checkpoints (ms since start):", file=file)
+        previous = 0.0
+        for label, elapsed in self.marks:
+            print(
+                f"  {elapsed * 1000:8.1f}  (+{(elapsed - previous) * 1000:7.1f})  "
+                f"{label}",
+                file=file,
+            )
+            previous = elapsed
+        for module in modules:
+            print(f"Slowest imports for {module} (self / cumulative ms):", file=file)
+            for name, self_us, cumulative_us in import_times(module)[:limit]:
+                print(
+                    f"  {self_us / 1000:8.1f}  {cumulative_us / 1000:8.1f}  {name}",
+                    file=file,
+                )
+
+
+def import_times(module):
+    """Return (module, self us, cumulative us) for importing module afresh.
+
+    The import runs in a child interpreter with ``-X importtime`` so modules
+    already loaded here do not hide their cost. Sorted by self time.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # the header line
+        timings.append((fields[2].strip(), self_us, cumulative_us))
+    return sorted(timings, key=lambda timing: timing[1], reverse=True)
+
+
+startup_profile = StartupProfile()
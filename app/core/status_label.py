@@ -5,8 +5,23 @@ from PyQt5.QtCore import Qt
 class StatusLabel(QLabel):
     def __init__(self):
         super().__init__()
+        self.status = "Status: Ready"
+        self.metrics = ""
         self.init_ui()
 
     def init_ui(self):
-        self.setText("Status: Ready")
+        self.setText(self.status)
         self.setAlignment(Qt.AlignCenter)
+
+    def set_status(self, status):
+        """Show a status message next to the metrics summary."""
+        self.status = status
+        self.refresh()
+
+    def set_metrics(self, metrics):
+        """Show a compact request metrics summary after the status."""
+        self.metrics = metrics
+        self.refresh()
+
+    def refresh(self):
+        self.setText(f"{self.status}  ({self.metrics})" if self.metrics else self.status)
@@ -0,0 +1,112 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+from app.llm.config import RECALL_DIMENSIONS
+
+WORD = re.compile(r"\w+")
+MIN_CAPACITY = 1024
+
+
+def embed(text, dimensions=RECALL_DIMENSIONS):
+    """Return the unit-length hashed embedding of a text.
+
+    Words and word pairs are hashed into a fixed number of signed buckets, so
+    embeddings need no model and are identical across runs and machines.
+    """
+    words = WORD.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dimensions, np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) for feature in features),
+        np.uint32,
+        len(features),
+    )
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dimensions, signs)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """Memory-mapped matrix of message embeddings, one row per message.
+
+    Row numbers are assigned by the caller. The file grows by doubling and is
+    mapped rather than read, so opening it costs nothing however many messages
+    it holds. Unused and cleared rows are zero and never match.
+    """
+
+    FILENAME = ".vectors.f32"
+
+    def __init__(self, directory, dimensions=RECALL_DIMENSIONS):
+        self.path = os.path.join(directory, self.FILENAME)
+        self.dimensions = dimensions
+        self.matrix = None
+        self.rows = 0  # rows in use, as reported by the caller
+        self.open()
+
+    def open(self):
+        row_bytes = self.dimensions * 4
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        capacity = size // row_bytes
+        self.matrix = (
+            np.memmap(self.path, np.float32, "r+", shape=(capacity, self.dimensions))
+            if capacity
+            else None
+        )
+
+    def capacity(self):
+        return 0 if self.matrix is None else len(self.matrix)
+
+    def reserve(self, rows):
+        """Grow the file to hold at least rows rows."""
+        if rows <= self.capacity():
+            return
+        capacity = max(rows, self.capacity() * 2, MIN_CAPACITY)
+        self.flush()
+        self.matrix = None
+        with open(self.path, "ab") as f:
+            f.truncate(capacity * self.dimensions * 4)
+        self.open()
+
+    def embed(self, text):
+        return embed(text, self.dimensions)
+
+    def add(self, row, text):
+        self.put(row, self.embed(text))
+
+    def put(self, row, vector):
+        self.reserve(row + 1)
+        self.matrix[row] = vector
+        self.rows = max(self.rows, row + 1)
+
+    def clear(self, rows):
+        rows = [row for row in rows if row < self.capacity()]
+        if rows:
+            self.matrix[rows] = 0
+
+    def reset(self):
+        """Drop every embedding, e.g. after the dimensions changed."""
+        self.matrix = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.rows = 0
+
+    def flush(self):
+        if self.matrix is not None:
+            self.matrix.flush()
+
+    def search(self, text, limit):
+        """Return (row, score) of the rows most similar to text, best first."""
+        rows = min(self.rows, self.capacity())
+        if not rows or limit <= 0:
+            return []
+        scores = self.matrix[:rows] @ embed(text, self.dimensions)
+        limit = min(limit, rows)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0]
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+
+import openai
+
+from .config import (
+    DEFAULT_MODEL,
+    INTERRUPTED_MESSAGE,
+    LOCAL_API_KEY,
+    MODEL_BASE_URLS,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_RETRY_LIMIT,
+)
+from .resilience import (
+    RETRYABLE_ERRORS,
+    STREAM_ERRORS,
+    RequestFailed,
+    backoff_delay,
+    circuit_breaker,
+    hedged_call_async,
+    hedged_stream_async,
+)
+from .response_cache import cache_key, get_response_cache
+from .telemetry import RequestTimer, telemetry
+from .transport import create_async_http_client, warm_up_async
+
+
+class LLMEngine:
+    """Asyncio execution engine sharing one AsyncOpenAI client and pool.
+
+    Every request holds a slot of a global semaphore while it talks to the
+    API, so any number of chats can be in flight while the number of open
+    connections stays bounded.
+    """
+
+    def __init__(self, max_concurrency=OPENAI_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.http_client = None
+        self.clients = {}
+        self.semaphore = None
+
+    def get_client(self, model=DEFAULT_MODEL):
+        """Return the client for a model's backend, inside the running loop.
+
+        Clients for every backend share one connection pool and semaphore.
+        """
+        if self.http_client is None:
+            self.http_client = create_async_http_client()
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        base_url = MODEL_BASE_URLS.get(model)
+        if base_url not in self.clients:
+            if base_url:
+                self.clients[base_url] = openai.AsyncOpenAI(
+                    base_url=base_url,
+                    api_key=LOCAL_API_KEY,
+                    http_client=self.http_client,
+                )
+            else:
+                self.clients[base_url] = openai.AsyncOpenAI(http_client=self.http_client)
+        return self.clients[base_url]
+
+    async def warm_up(self, model=DEFAULT_MODEL):
+        """Open a connection to a model's backend while the user is typing."""
+        client = self.get_client(model)
+        await warm_up_async(self.http_client, str(client.base_url))
+
+    async def metrics(self):
+        """Return the telemetry summary for the status bar."""
+        return telemetry.summary()
+
+    async def ask_llm(self, chat_log, model=DEFAULT_MODEL):
+        """Return the full response, mirroring openai_integration.ask_llm."""
+        timer = RequestTimer(model)
+        try:
+            result = await self.cached_generate_text(chat_log, model)
+        except RequestFailed as e:
+            timer.finish(failed=True)
+            return str(e), None, None, None
+        timer.finish()
+        return result
+
+    async def cached_generate_text(self, chat_log, model=DEFAULT_MODEL):
+        """Call resilient_generate_text through the response cache if enabled."""
+        cache = get_response_cache()
+        if cache is None:
+            return await self.resilient_generate_text(chat_log, model)
+        key = cache_key(model, chat_log)
+        answer, flight = cache.get(key), None
+        if answer is None:
+            answer, flight = await cache.join_flight(key)
+        if answer is not None:
+            return answer, None, model, None
+        if flight is None:
+            return await self.resilient_generate_text(chat_log, model)
+        result = None
+        try:
+            result = await self.resilient_generate_text(chat_log, model)
+        finally:
+            cache.finish_flight(key, flight, result[0] if result else None)
+        return result
+
+    async def resilient_generate_text(self, chat_log, model=DEFAULT_MODEL):
+        """Call generate_text with retries, hedging and the circuit breaker."""
+        for attempt in range(OPENAI_RETRY_LIMIT + 1):
+            if not circuit_breaker.allow():
+                break
+            try:
+                result = await hedged_call_async(
+                    lambda m: self.generate_text(chat_log, m), model
+                )
+                circuit_breaker.record_success()
+                return result
+            except RETRYABLE_ERRORS as e:
+                logging.error(f"OpenAI API error: {e}")
+                circuit_breaker.record_failure()
+                if attempt < OPENAI_RETRY_LIMIT:
+                    telemetry.count("opal_llm_retries_total", model)
+                    await asyncio.sleep(backoff_delay(attempt))
+            except Exception as e:
+                logging.error(f"Unexpected error: {e}")
+                break
+        raise RequestFailed(circuit_breaker.failure_message())
+
+    async def generate_text(self, chat_log, model=DEFAULT_MODEL):
+        """Request a complete response from the API."""
+        client = self.get_client(model)
+        async with self.semaphore:
+            res = await client.chat.completions.create(
+                model=model,
+                messages=chat_log,
+            )
+        telemetry.record_usage(model, res.usage)
+        return res.choices[0].message.content.strip(), None, model, res
+
+    async def ask_llm_stream(self, chat_log, model=DEFAULT_MODEL):
+        """Yield response deltas as they are generated.
+
+        A response that breaks off ends with INTERRUPTED_MESSAGE and is not cached.
+        """
+        timer = RequestTimer(model)
+        cache = get_response_cache()
+        key = flight = None
+        if cache is not None:
+            key = cache_key(model, chat_log)
+            answer = cache.get(key)
+            if answer is None:
+                answer, flight = await cache.join_flight(key)
+            if answer is not None:
+                timer.token()
+                timer.finish()
+                yield answer
+                return
+        parts, completed, cancelled = [], False, False
+        try:
+            async for delta in self.resilient_stream_text(chat_log, model):
+                timer.token()
+                parts.append(delta)
+                yield delta
+            completed = True
+        except (asyncio.CancelledError, GeneratorExit):
+            # The consumer cancelled the request or closed the stream early.
+            cancelled = True
+            raise
+        except RequestFailed as e:
+            yield INTERRUPTED_MESSAGE if parts else str(e)
+        except Exception as e:
+            logging.error(f"Streaming error: {e}")
+            yield INTERRUPTED_MESSAGE if parts else circuit_breaker.failure_message()
+        finally:
+            timer.finish(failed=not (completed or cancelled))
+            if flight is not None:
+                answer = "".join(parts).strip() if completed and parts else None
+                cache.finish_flight(key, flight, answer)
+
+    async def resilient_stream_text(self, chat_log, model=DEFAULT_MODEL):
+        """Yield from a hedged stream, retrying failures before the first delta."""
+        for attempt in range(OPENAI_RETRY_LIMIT + 1):
+            if not circuit_breaker.allow():
+                break
+            received = False
+            try:
+                async for delta in hedged_stream_async(
+                    lambda m: self.stream_text(chat_log, m), model
+                ):
+                    received = True
+                    yield delta
+                circuit_breaker.record_success()
+                return
+            except STREAM_ERRORS as e:
+                logging.error(f"OpenAI API error: {e}")
+                circuit_breaker.record_failure()
+                if received:
+                    raise
+                if attempt < OPENAI_RETRY_LIMIT:
+                    telemetry.count("opal_llm_retries_total", model)
+                    await asyncio.sleep(backoff_delay(attempt))
+        raise RequestFailed(circuit_breaker.failure_message())
+
+    async def stream_text(self, chat_log, model=DEFAULT_MODEL):
+        """Yield response deltas from the API."""
+        client = self.get_client(model)
+        async with self.semaphore:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=chat_log,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        telemetry.record_usage(model, chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Aborts the HTTP stream if the request was cancelled.
+                await stream.close()
+
+    async def close(self):
+        """Close the shared connection pool."""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            self.clients = {}
+
+
+engine = LLMEngine()
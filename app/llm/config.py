@@ -1,11 +1,9 @@
 import os
 from dotenv import load_dotenv
-import pytz
-from datetime import datetime
 
 # Date-related Configurations
-eastern = pytz.timezone("US/Eastern")
-TODAYS_DATE = datetime.now(eastern).strftime("%A, %B %d, %Y")
+TIMEZONE = "America/New_York"
+DATE_FORMAT = "%A, %B %d, %Y"
 
 # Load Environment Variables
 load_dotenv()
@@ -14,10 +12,29 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # OpenAI Configurations
-OPENAI_RETRY_LIMIT = 0
+OPENAI_RETRY_LIMIT = 3  # retries after the first attempt
 OPENAI_BASE_DELAY = 2
 OPENAI_MAX_DELAY = 10
 OPENAI_JITTER = 0.5
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+SCHEDULER_MAX_WORKERS = int(
+    os.getenv("SCHEDULER_MAX_WORKERS", str(OPENAI_MAX_CONCURRENCY))
+)
+
+# HTTP Transport Configurations
+HTTP2_ENABLED = os.getenv("OPAL_HTTP2", "1") == "1"  # needs the h2 package
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("OPAL_HTTP_KEEPALIVE", "300"))  # seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("OPAL_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("OPAL_HTTP_READ_TIMEOUT", "120"))
+HTTP_WARM_UP_INTERVAL = 60  # seconds between connection warm-ups per backend
+
+# Resilience Configurations
+HEDGE_ENABLED = os.getenv("OPAL_HEDGE_REQUESTS", "1") == "1"
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # latency samples needed before hedging kicks in
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30  # seconds
 
 # OpenAI Models
 OPENAI_MODELS = [
@@ -30,6 +47,78 @@ OPENAI_MODELS = [
 FAST_MODEL = "gpt-4o"
 SLOW_MODEL = "gpt-4"
 DEFAULT_MODEL = FAST_MODEL
+HEDGE_MODEL = os.getenv("OPAL_HEDGE_MODEL", "") or None  # e.g. FAST_MODEL
+
+# Context Window Configurations
+OPENAI_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4o": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+
+# Local Backend Configurations
+LOCAL_BASE_URL = os.getenv("OPAL_LOCAL_BASE_URL", "")  # e.g. http://localhost:8080/v1
+LOCAL_MODEL = os.getenv("OPAL_LOCAL_MODEL", "local")
+LOCAL_API_KEY = os.getenv("OPAL_LOCAL_API_KEY", "none")
+LOCAL_CONTEXT_WINDOW = int(os.getenv("OPAL_LOCAL_CONTEXT_WINDOW", "8192"))
+
+# Base URL of each model; None means the OpenAI API
+MODEL_BASE_URLS = {model: None for model in OPENAI_MODELS}
+if LOCAL_BASE_URL:
+    OPENAI_MODELS.append(LOCAL_MODEL)
+    MODEL_BASE_URLS[LOCAL_MODEL] = LOCAL_BASE_URL
+    OPENAI_CONTEXT_WINDOWS[LOCAL_MODEL] = LOCAL_CONTEXT_WINDOW
+
+# Routing Configurations
+AUTO_MODEL = "Auto"
+ROUTER_HEAVY_TOKENS = 3000  # prompts at least this large go to SLOW_MODEL
+ROUTER_HEAVY_LEVEL = 4  # V= or T= at or above this level is a heavy question
+ROUTER_LIGHT_LEVEL = 1  # V= and T= at or below this level is a quick lookup
+ROUTER_WINDOW = 20  # recent requests kept per backend
+ROUTER_MAX_ERROR_RATE = 0.5  # backends failing more often are skipped
+CONTEXT_RESPONSE_RESERVE = 1024  # tokens kept free for the reply
+CONTEXT_BUDGET_CAP = int(os.getenv("CONTEXT_BUDGET_CAP", "12000"))
+
+# Streaming Configurations
+STREAM_RESPONSES = True
+STREAM_BATCH_INTERVAL = 0.05  # seconds between delta batches sent to the UI
+
+# Persistence Configurations
+PERSIST_DURABILITY = os.getenv("OPAL_DURABILITY", "batch")  # none, batch or message
+PERSIST_COALESCE_WINDOW = 0.05  # seconds of writes gathered into one batch
+CHAT_ARCHIVE_AFTER_DAYS = float(os.getenv("OPAL_ARCHIVE_AFTER_DAYS", "30"))
+
+# Logging Configurations
+LOG_LEVEL = os.getenv("OPAL_LOG_LEVEL", "INFO").upper()
+
+# Daemon Configurations
+DAEMON_ENABLED = os.getenv("OPAL_DAEMON", "0") == "1"
+# The socket lives in a directory only this user can enter (mode 0700).
+DAEMON_DIR = os.getenv("XDG_RUNTIME_DIR") or os.path.join(
+    os.getenv("TMPDIR") or "/tmp", f"opal-{os.getuid()}"
+)
+DAEMON_SOCKET = os.getenv("OPAL_DAEMON_SOCKET", "") or os.path.join(
+    DAEMON_DIR, "opal.sock"
+)
+DAEMON_START_TIMEOUT = 5  # seconds to wait for an auto-started daemon
+DAEMON_MAX_LINE = 64 * 1024 * 1024  # largest protocol message in bytes
+
+# Telemetry Configurations
+METRICS_PORT = int(os.getenv("OPAL_METRICS_PORT", "0"))  # 0 disables the endpoint
+
+# Response Cache Configurations
+RESPONSE_CACHE_ENABLED = os.getenv("OPAL_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_PATH = os.getenv("OPAL_RESPONSE_CACHE_PATH", "app/.cache/responses.db")
+RESPONSE_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Recall Configurations
+RECALL_ENABLED = os.getenv("OPAL_RECALL", "1") == "1"  # needs numpy
+RECALL_DIMENSIONS = 384  # size of the hashed message embeddings
+RECALL_TOP_K = 4
+RECALL_MIN_SCORE = 0.2  # cosine similarity a past message needs to be recalled
+RECALL_MAX_CHARS = 1000  # recalled messages are clipped to this length
+RECALL_CONTEXT_BUDGET = 6000  # prompt tokens when recall is available
 
 # OpenAI System Messages
 OPENAI_SYSTEM_MESSAGE = {
@@ -46,7 +135,7 @@ OPENAI_SYSTEM_MESSAGE = {
     - **Role**: A friendly personal assistant aimed at making users' lives easier through supportive and engaging interactions.
 
     ### Key Responsibilities
-    - **Current Date Awareness**: Always be aware of today's date ({TODAYS_DATE}) for contextually relevant assistance.
+    - **Current Date Awareness**: Always be aware of today's date (given at the end of the conversation) for contextually relevant assistance.
     - **Accuracy and Contextual Relevance**: Deliver precise answers specifically tailored to the query's context.
     - **Proactive Clarification**: If a query is unclear, politely seek further information to provide the most accurate assistance.
     - **Knowledge Up-to-Date Until April 2023**: Remember, your information is up to date only until April 2023.
@@ -66,12 +155,9 @@ OPENAI_SYSTEM_MESSAGE = {
 
 OPENAI_SYSTEM_INSTRUCTIONS = {
     "role": "system",
-    "content": f"""
+    "content": """
     ## Assistant Instructions
     
-    ### Today's Date
-    For your reference, today's date is {TODAYS_DATE}.
-    
     ### Assistant Response Complexity & Technicality
     
     #### Verbosity (V)
@@ -151,8 +237,16 @@ OPENAI_SYSTEM_INSTRUCTIONS = {
     """,
 }
 
+# System prompts compiled into the stable prompt prefix, in order; see
+# app/llm/prompt_compiler.py. Volatile content goes in DATE_PROMPT instead.
+OPENAI_SYSTEM_PROMPTS = {
+    "system message": OPENAI_SYSTEM_MESSAGE,
+}
+DATE_PROMPT = "Today's date is {today}."
+
 # Configuration constants
 MAINTENANCE_MESSAGE = (
     "Sorry, Opal is currently undergoing maintenance. Please try again later."
 )
 ERROR_MESSAGE = "Sorry, something went wrong. Please try again."
+INTERRUPTED_MESSAGE = "\n\n[The response was cut off. Please try again.]"
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import threading
+
+from .config import (
+    CONTEXT_BUDGET_CAP,
+    CONTEXT_RESPONSE_RESERVE,
+    FAST_MODEL,
+    OPENAI_CONTEXT_WINDOWS,
+    RECALL_CONTEXT_BUDGET,
+    RECALL_MAX_CHARS,
+    RECALL_TOP_K,
+)
+from .message import Message
+from .prompt_compiler import system_message, volatile_message
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference. Keep "
+    "names, facts, decisions, open questions and the user's preferences. "
+    "Fold in the existing summary if there is one. Reply with the summary only."
+)
+
+summaries_in_flight = set()
+summaries_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """Roughly estimate the token count of a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def count_tokens(message):
+    """Return the estimated token count of a message, cached on the message."""
+    if message.tokens is None:
+        message.tokens = estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+    return message.tokens
+
+
+def context_budget(model):
+    """Return the prompt token budget for a model."""
+    window = OPENAI_CONTEXT_WINDOWS.get(model, min(OPENAI_CONTEXT_WINDOWS.values()))
+    return min(window - CONTEXT_RESPONSE_RESERVE, CONTEXT_BUDGET_CAP)
+
+
+def summary_message(summary):
+    """Return the system message carrying a rolling summary."""
+    return Message(
+        "system", f"Summary of the earlier conversation:\n{summary['content']}"
+    )
+
+
+def recall_message(recalled):
+    """Return the system message quoting recalled (chat, position, role, content)."""
+    lines = [
+        f"[{chat}] {'user' if role == 'user' else 'assistant'}: "
+        f"{content[:RECALL_MAX_CHARS]}"
+        for chat, _, role, content in recalled
+    ]
+    return Message(
+        "system", "Possibly relevant messages from past chats:\n" + "\n".join(lines)
+    )
+
+
+def context_tokens(chat_log, summary=None):
+    """Return the prompt size before trimming: the summary and the turns it
+    does not cover, capped at the largest budget any model allows."""
+    start = 1 if chat_log and chat_log[0].role == "system" else 0
+    covered = max(summary.get("covered", start), start) if summary else start
+    tokens = sum(count_tokens(m) for m in chat_log[:start] + chat_log[covered:])
+    if summary and summary.get("content"):
+        tokens += count_tokens(summary_message(summary))
+    return min(tokens, max(context_budget(m) for m in OPENAI_CONTEXT_WINDOWS))
+
+
+def build_context(chat_log, model, summary=None, recalled=()):
+    """Fit the chat log into the model's budget, in the OpenAI messages format.
+
+    A stored system message is replaced by the compiled system prompt, and the
+    volatile prompt goes last so everything before it stays a cacheable prefix.
+    recalled messages from the recall index go just before it, and with them
+    the budget shrinks to RECALL_CONTEXT_BUDGET so prompts stay small.
+    Returns the messages to send and the (start, end) range of chat log entries
+    that were dropped but are not yet covered by the summary, or None.
+    """
+    budget = context_budget(model)
+    if recalled:
+        budget = min(budget, RECALL_CONTEXT_BUDGET)
+    start = 1 if chat_log and chat_log[0].role == "system" else 0
+    head = [system_message()] if start else []
+    tail = [volatile_message()] if start else []
+    used = sum(count_tokens(m) for m in head + tail)
+    recalled = list(recalled)[: RECALL_TOP_K * 2]
+    if recalled:
+        used += count_tokens(recall_message(recalled[:RECALL_TOP_K]))
+    if summary and summary.get("content"):
+        head.append(summary_message(summary))
+        used += count_tokens(head[-1])
+
+    cut = len(chat_log)
+    while cut > start and used + count_tokens(chat_log[cut - 1]) <= budget:
+        used += count_tokens(chat_log[cut - 1])
+        cut -= 1
+    # Always send the newest turn, even if it alone exceeds the budget.
+    cut = min(cut, len(chat_log) - 1) if len(chat_log) > start else cut
+
+    # Skip recalled messages that are being sent anyway.
+    sent = {m.content for m in chat_log[cut:]}
+    recalled = [r for r in recalled if r[3] not in sent][:RECALL_TOP_K]
+    if recalled:
+        tail.insert(0, recall_message(recalled))
+
+    messages = [m.to_api() for m in head + chat_log[cut:] + tail]
+    covered = summary.get("covered", start) if summary else start
+    pending = (max(covered, start), cut) if cut > max(covered, start) else None
+    return messages, pending
+
+
+def summary_request(summary, turns):
+    """Build the messages asking FAST_MODEL for an updated summary.
+
+    A turn too long to fit FAST_MODEL's budget on its own is clipped.
+    """
+    limit = context_budget(FAST_MODEL) * CHARS_PER_TOKEN // 2
+    transcript = "\n\n".join(f"{m.role}: {m.content[:limit]}" for m in turns)
+    existing = summary.get("content", "") if summary else ""
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {
+            "role": "user",
+            "content": f"Existing summary:\n{existing}\n\nConversation:\n{transcript}",
+        },
+    ]
+
+
+def summary_window(chat_log, start, end, summary):
+    """Return where the next batch of turns to fold into the summary ends.
+
+    The batch starts at start, holds at least one turn and otherwise fits
+    FAST_MODEL's budget next to the prompt and the existing summary.
+    """
+    budget = context_budget(FAST_MODEL) - estimate_tokens(SUMMARY_PROMPT)
+    if summary and summary.get("content"):
+        budget -= count_tokens(summary_message(summary))
+    stop, used = start, 0
+    while stop < end and (
+        stop == start or used + count_tokens(chat_log[stop]) <= budget
+    ):
+        used += count_tokens(chat_log[stop])
+        stop += 1
+    return stop
+
+
+def claim_summary(key):
+    """Return True if no summary is being generated for key yet."""
+    with summaries_lock:
+        if key in summaries_in_flight:
+            return False
+        summaries_in_flight.add(key)
+        return True
+
+
+def release_summary(key):
+    with summaries_lock:
+        summaries_in_flight.discard(key)
+
+
+async def update_summary_async(key, chat_log, summary, pending, on_summary):
+    """Fold dropped turns into the rolling summary with FAST_MODEL.
+
+    The turns are sent in batches that fit the budget, and covered advances
+    after each one, so a failure only loses the batch in progress.
+    """
+    from .process_message import engine
+
+    try:
+        start, end = pending
+        while start < end:
+            stop = summary_window(chat_log, start, end, summary)
+            ans, _, model_used, _ = await engine.ask_llm(
+                summary_request(summary, chat_log[start:stop]), FAST_MODEL
+            )
+            if model_used is None or not ans:
+                return  # the request failed; the next message retries it
+            summary = {"content": ans, "covered": stop}
+            on_summary(summary)
+            start = stop
+    except Exception as e:
+        logging.error(f"Error updating summary: {e}")
+    finally:
+        release_summary(key)
+
+
+def update_summary(key, chat_log, summary, pending, on_summary):
+    """Blocking counterpart of update_summary_async for threaded callers."""
+    from .openai_integration import generate_text
+
+    try:
+        start, end = pending
+        while start < end:
+            stop = summary_window(chat_log, start, end, summary)
+            ans, _, _, _ = generate_text(
+                summary_request(summary, chat_log[start:stop]), FAST_MODEL
+            )
+            if not ans:
+                return
+            summary = {"content": ans, "covered": stop}
+            on_summary(summary)
+            start = stop
+    except Exception as e:
+        logging.error(f"Error updating summary: {e}")
+    finally:
+        release_summary(key)
+
+
+def schedule_summary(chat_log, summary, pending, on_summary):
+    """Start a background summary update unless one is already running."""
+    if not pending or on_summary is None:
+        return
+    key = id(chat_log)
+    if not claim_summary(key):
+        return
+    # Copy the range now; the chat log keeps growing while the summary runs.
+    snapshot = chat_log[: pending[1]]
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        loop.create_task(
+            update_summary_async(key, snapshot, summary, pending, on_summary)
+        )
+    else:
+        threading.Thread(
+            target=update_summary,
+            args=(key, snapshot, summary, pending, on_summary),
+            daemon=True,
+        ).start()
@@ -0,0 +1,223 @@
+"""Client side of the backend daemon in app.core.daemon.
+
+RemoteEngine stands in for LLMEngine, and ask_llm for its
+openai_integration counterpart, so process_message works the same
+either way. The daemon is started on demand if nothing is listening yet.
+Importing this module does not import the OpenAI SDK.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from .config import (
+    DAEMON_MAX_LINE,
+    DAEMON_SOCKET,
+    DAEMON_START_TIMEOUT,
+    DEFAULT_MODEL,
+    ERROR_MESSAGE,
+    INTERRUPTED_MESSAGE,
+)
+from .telemetry import RequestTimer
+
+POLL_INTERVAL = 0.05
+
+daemon_process = None
+start_lock = threading.Lock()
+
+
+def start_daemon():
+    """Launch the daemon in its own session so it outlives this process.
+
+    Does nothing while a daemon this process started is still running, so
+    concurrent requests that find no socket start it only once.
+    """
+    global daemon_process
+    with start_lock:
+        if daemon_process is not None and daemon_process.poll() is None:
+            return
+        logging.info("Starting the backend daemon")
+        daemon_process = subprocess.Popen(
+            [sys.executable, "-m", "app.core.daemon", "--socket", DAEMON_SOCKET],
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+
+def peer_uid(sock):
+    """Return the uid of the process at the other end of a Unix socket."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return os.getuid()  # not available here; the 0700 directory still applies
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    return struct.unpack("3i", creds)[1]
+
+
+def check_peer(sock):
+    """Raise PermissionError unless the peer runs as the current user."""
+    if peer_uid(sock) != os.getuid():
+        raise PermissionError(f"{DAEMON_SOCKET} is served by another user")
+
+
+def encode(op, model, messages=None):
+    request = {"op": op, "model": model}
+    if messages is not None:
+        request["messages"] = messages
+    return json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def answer_of(reply, timer):
+    """Return the ask_llm result for a daemon reply and finish its timer."""
+    if "answer" not in reply:
+        logging.error(f"Daemon error: {reply.get('error', reply)}")
+        timer.finish(failed=True)
+        return ERROR_MESSAGE, None, None, None
+    timer.finish(failed=reply.get("model") is None)
+    return reply["answer"], reply.get("url"), reply.get("model"), reply.get("response")
+
+
+class RemoteEngine:
+    """Forward asyncio requests to the daemon, one connection per request."""
+
+    async def connect(self):
+        deadline, started = time.monotonic() + DAEMON_START_TIMEOUT, False
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(
+                    DAEMON_SOCKET, limit=DAEMON_MAX_LINE
+                )
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not started:
+                    start_daemon()
+                    started = True
+                elif time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            try:
+                check_peer(writer.get_extra_info("socket"))
+            except OSError:
+                writer.close()
+                raise
+            return reader, writer
+
+    async def send(self, op, model, messages=None):
+        reader, writer = await self.connect()
+        writer.write(encode(op, model, messages))
+        await writer.drain()
+        return reader, writer
+
+    async def ask_llm(self, chat_log, model=DEFAULT_MODEL):
+        """Return the full response, mirroring LLMEngine.ask_llm."""
+        timer = RequestTimer(model)
+        writer = None
+        try:
+            reader, writer = await self.send("ask", model, chat_log)
+            reply = json.loads(await reader.readline())
+        except (OSError, ValueError) as e:
+            logging.error(f"Daemon error: {e}")
+            timer.finish(failed=True)
+            return ERROR_MESSAGE, None, None, None
+        finally:
+            if writer is not None:
+                writer.close()
+        return answer_of(reply, timer)
+
+    async def ask_llm_stream(self, chat_log, model=DEFAULT_MODEL):
+        """Yield response deltas; cancelling closes the connection."""
+        timer = RequestTimer(model)
+        writer, received, completed, cancelled = None, False, False, False
+        try:
+            reader, writer = await self.send("stream", model, chat_log)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("daemon closed the connection")
+                reply = json.loads(line)
+                if reply.get("done"):
+                    completed = True
+                    return
+                timer.token()
+                received = True
+                yield reply["delta"]
+        except (asyncio.CancelledError, GeneratorExit):
+            # The consumer cancelled the request or closed the stream early.
+            cancelled = True
+            raise
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Daemon error: {e}")
+            yield INTERRUPTED_MESSAGE if received else ERROR_MESSAGE
+        finally:
+            if writer is not None:
+                writer.close()
+            timer.finish(failed=not (completed or cancelled))
+
+    async def warm_up(self, model=DEFAULT_MODEL):
+        """Have the daemon open a connection to a model's backend."""
+        try:
+            reader, writer = await self.send("warm_up", model)
+            await reader.readline()
+            writer.close()
+        except OSError as e:
+            logging.debug(f"Daemon warm-up failed: {e}")
+
+    async def metrics(self):
+        """Return the daemon's telemetry summary, which covers every client."""
+        try:
+            reader, writer = await self.send("metrics", None)
+            reply = json.loads(await reader.readline())
+            writer.close()
+        except (OSError, ValueError) as e:
+            logging.debug(f"Daemon metrics unavailable: {e}")
+            return ""
+        return reply.get("metrics", "")
+
+    async def close(self):
+        """Nothing to release; the daemon keeps the connection pool."""
+
+
+engine = RemoteEngine()
+
+
+def connect():
+    """Return a socket connected to the daemon, starting it if needed."""
+    deadline, started = time.monotonic() + DAEMON_START_TIMEOUT, False
+    while True:
+        sock = socket.socket(socket.AF_UNIX)
+        try:
+            sock.connect(DAEMON_SOCKET)
+            check_peer(sock)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if not started:
+                start_daemon()
+                started = True
+            elif time.monotonic() > deadline:
+                raise
+            time.sleep(POLL_INTERVAL)
+        except OSError:
+            sock.close()
+            raise
+
+
+def ask_llm(chat_log, model=DEFAULT_MODEL):
+    """Blocking counterpart of RemoteEngine.ask_llm for threaded callers."""
+    timer = RequestTimer(model)
+    try:
+        with connect() as sock:
+            sock.sendall(encode("ask", model, chat_log))
+            reply = json.loads(sock.makefile("rb").readline())
+    except (OSError, ValueError) as e:
+        logging.error(f"Daemon error: {e}")
+        timer.finish(failed=True)
+        return ERROR_MESSAGE, None, None, None
+    return answer_of(reply, timer)
@@ -0,0 +1,79 @@
+import itertools
+import sys
+
+message_ids = itertools.count(1)
+
+
+class Message:
+    """One chat message, kept compact and converted to API format on send.
+
+    Roles are interned so every message shares the same few role strings.
+    ids are unique per process and let a ChatHistory hold each message once.
+    """
+
+    __slots__ = ("id", "role", "content", "url", "tokens")
+
+    def __init__(self, role, content, url=""):
+        self.id = next(message_ids)
+        self.role = sys.intern(role)
+        self.content = content
+        self.url = url or ""
+        self.tokens = None  # estimated prompt tokens, filled in on first use
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a message from a stored or OpenAI-format dict."""
+        return cls(data.get("role", "user"), data.get("content") or "", data.get("url"))
+
+    def to_dict(self):
+        """Return the dict written to chat storage."""
+        data = {"role": self.role, "content": self.content}
+        if self.url:
+            data["url"] = self.url
+        return data
+
+    def to_api(self):
+        """Return the message in the OpenAI messages format."""
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.content[:40]!r})"
+
+
+class ChatHistory:
+    """The single authoritative, ordered list of a chat's messages.
+
+    Appending a message that is already present is a no-op, so code paths
+    that hand the same turn along cannot duplicate it.
+    """
+
+    def __init__(self, messages=()):
+        self.messages = []
+        self.ids = set()
+        for message in messages:
+            self.append(message)
+
+    @classmethod
+    def from_dicts(cls, records):
+        return cls(Message.from_dict(record) for record in records)
+
+    def append(self, message):
+        """Append a message; return False if it is already in the history."""
+        if message.id in self.ids:
+            return False
+        self.ids.add(message.id)
+        self.messages.append(message)
+        return True
+
+    def to_api(self):
+        """Serialize the whole history to the OpenAI messages format."""
+        return [message.to_api() for message in self.messages]
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
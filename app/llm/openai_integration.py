@@ -1,44 +1,120 @@
 import openai
 import logging
+import threading
+import time
 
 from .config import (
     DEFAULT_MODEL,
+    LOCAL_API_KEY,
+    MODEL_BASE_URLS,
     OPENAI_API_KEY,
-    OPENAI_BASE_DELAY,
-    OPENAI_JITTER,
     OPENAI_RETRY_LIMIT,
 )
+from .resilience import (
+    RETRYABLE_ERRORS,
+    RequestFailed,
+    backoff_delay,
+    circuit_breaker,
+    hedged_call,
+)
+from . import transport
+from .response_cache import cache_key, get_response_cache
+from .telemetry import RequestTimer, telemetry
+
+http_client = None
+clients = {}
+client_lock = threading.Lock()
+
+
+def get_client(model=DEFAULT_MODEL):
+    """Return the shared client for a model's backend, creating it on first use.
+
+    Clients for every backend share one tuned connection pool.
+    """
+    global http_client
+    base_url = MODEL_BASE_URLS.get(model)
+    client = clients.get(base_url)
+    if client is None:
+        with client_lock:
+            client = clients.get(base_url)
+            if client is None:
+                if http_client is None:
+                    http_client = transport.create_http_client()
+                if base_url:
+                    client = openai.OpenAI(
+                        base_url=base_url,
+                        api_key=LOCAL_API_KEY,
+                        http_client=http_client,
+                    )
+                else:
+                    client = openai.OpenAI(http_client=http_client)
+                clients[base_url] = client
+    return client
 
-client = openai.OpenAI()
+
+def warm_up(model=DEFAULT_MODEL):
+    """Open a connection to a model's backend before the first request."""
+    client = get_client(model)
+    transport.warm_up(http_client, str(client.base_url))
 
 
 def ask_llm(chat_log, model=DEFAULT_MODEL):
-    ans, url, model_used, response_json = None, None, None, None
-    retries = OPENAI_RETRY_LIMIT
-    base_delay = OPENAI_BASE_DELAY
-    jitter = OPENAI_JITTER
+    timer = RequestTimer(model)
+    try:
+        ans, url, model_used, response_json = cached_generate_text(chat_log, model)
+    except RequestFailed as e:
+        timer.finish(failed=True)
+        return str(e), None, None, None
+    timer.finish()
+    return ans.strip(), url, model_used, response_json
+
+
+def cached_generate_text(chat_log, model=DEFAULT_MODEL):
+    """Call generate_text through the response cache when it is enabled."""
+    cache = get_response_cache()
+    if cache is None:
+        return resilient_generate_text(chat_log, model)
+    result = {}
 
-    while ans is None and retries < 3:
+    def compute():
+        result["value"] = resilient_generate_text(chat_log, model)
+        return result["value"][0]
+
+    ans = cache.get_or_compute(cache_key(model, chat_log), compute)
+    if "value" in result:
+        return result["value"]
+    return ans, None, model, None
+
+
+def resilient_generate_text(chat_log, model=DEFAULT_MODEL):
+    """Call generate_text with retries, hedging and the circuit breaker.
+
+    Raises RequestFailed with the message to show once all attempts failed.
+    """
+    for attempt in range(OPENAI_RETRY_LIMIT + 1):
+        if not circuit_breaker.allow():
+            break
         try:
-            ans, url, model_used, response_json = generate_text(chat_log, model)
-        except openai.APIConnectionError as e:
+            result = hedged_call(lambda m: generate_text(chat_log, m), model)
+            circuit_breaker.record_success()
+            return result
+        except RETRYABLE_ERRORS as e:
             logging.error(f"OpenAI API error: {e}")
-            retries += 1
-            time.sleep(base_delay * (2**retries) + jitter * random.random())
+            circuit_breaker.record_failure()
+            if attempt < OPENAI_RETRY_LIMIT:
+                telemetry.count("opal_llm_retries_total", model)
+                time.sleep(backoff_delay(attempt))
         except Exception as e:
             logging.error(f"Unexpected error: {e}")
             break
-
-    if ans is None:
-        ans = "ERROR_MESSAGE"
-
-    return ans.strip(), url, model_used, response_json
+    raise RequestFailed(circuit_breaker.failure_message())
 
 
 def generate_text(chat_log, model=DEFAULT_MODEL):
-    res = client.chat.completions.create(
+    res = get_client(model).chat.completions.create(
         model=model,
         messages=chat_log,
     )
+    telemetry.record_usage(model, res.usage)
     ans = res.choices[0].message.content.strip()
     return ans, None, model, res
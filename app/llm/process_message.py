@@ -1,15 +1,132 @@
-from .openai_integration import ask_llm
-from .config import DEFAULT_MODEL, OPENAI_SYSTEM_MESSAGE
+import asyncio
 
+from .context_manager import build_context, context_tokens, schedule_summary
+from .config import DAEMON_ENABLED, DEFAULT_MODEL, RECALL_TOP_K
+from .message import Message
+from .prompt_compiler import system_message
+from .router import resolve
 
-def process_message(user_message, chat_log, model=DEFAULT_MODEL):
+if DAEMON_ENABLED:
+    from .daemon_client import ask_llm, engine
+else:
+    from .async_engine import engine
+    from .openai_integration import ask_llm
+
+
+def append_user_turn(chat_log, user_message):
+    """Append a user turn, seeding a new chat with the system message.
+
+    Returns the appended Message; user_message is text or a Message, which is
+    not appended again if the caller already added it.
+    """
     if not chat_log:
-        chat_log.append(OPENAI_SYSTEM_MESSAGE)
+        chat_log.append(system_message())
+    if isinstance(user_message, str):
+        user_message = Message("user", user_message)
+    chat_log.append(user_message)
+    return user_message
+
+
+def prepare_context(user_message, chat_log, model, summary, on_summary, recall=None):
+    """Append the user turn and return the budgeted messages and the model.
+
+    chat_log is a ChatHistory; user_message is text or a Message, which is not
+    appended again if the caller already added it. An "Auto" model is resolved
+    to a backend here. recall(text, limit), if given, returns past messages
+    relevant to the user turn.
+    """
+    user_message = append_user_turn(chat_log, user_message)
+    recalled = recall(user_message.content, RECALL_TOP_K * 2) if recall else ()
+    return fit_context(user_message, chat_log, model, summary, on_summary, recalled)
+
+
+async def prepare_context_async(
+    user_message, chat_log, model, summary, on_summary, recall=None
+):
+    """Async counterpart of prepare_context; recall runs on a worker thread.
+
+    The user turn is appended before the first await.
+    """
+    user_message = append_user_turn(chat_log, user_message)
+    recalled = ()
+    if recall:
+        recalled = await asyncio.to_thread(
+            recall, user_message.content, RECALL_TOP_K * 2
+        )
+    return fit_context(user_message, chat_log, model, summary, on_summary, recalled)
+
+
+def fit_context(user_message, chat_log, model, summary, on_summary, recalled):
+    """Resolve the model, budget the messages and schedule a summary update."""
+    prompt_tokens = context_tokens(chat_log, summary)
+    model = resolve(model, user_message.content, prompt_tokens)
+    messages, pending = build_context(chat_log, model, summary, recalled)
+    schedule_summary(chat_log, summary, pending, on_summary)
+    return messages, model
+
 
-    chat_log.append({"role": "user", "content": user_message})
+def process_message(
+    user_message,
+    chat_log,
+    model=DEFAULT_MODEL,
+    summary=None,
+    on_summary=None,
+    recall=None,
+):
+    messages, model = prepare_context(
+        user_message, chat_log, model, summary, on_summary, recall
+    )
 
-    ans, url, model_used, response_json = ask_llm(chat_log, model)
+    ans, url, model_used, response_json = ask_llm(messages, model)
 
-    chat_log.append({"role": "assistant", "content": ans})
+    chat_log.append(Message("assistant", ans, url))
 
     return ans, url, chat_log, model_used, response_json
+
+
+async def process_message_async(
+    user_message,
+    chat_log,
+    model=DEFAULT_MODEL,
+    summary=None,
+    on_summary=None,
+    recall=None,
+):
+    messages, model = await prepare_context_async(
+        user_message, chat_log, model, summary, on_summary, recall
+    )
+
+    ans, url, model_used, response_json = await engine.ask_llm(messages, model)
+
+    chat_log.append(Message("assistant", ans, url))
+
+    return ans, url, chat_log, model_used, response_json
+
+
+async def process_message_stream_async(
+    user_message,
+    chat_log,
+    model=DEFAULT_MODEL,
+    summary=None,
+    on_summary=None,
+    recall=None,
+):
+    """Yield response deltas; the full answer is appended to chat_log at the end.
+
+    If the request is cancelled, the partial answer is appended to chat_log.
+    """
+    messages, model = await prepare_context_async(
+        user_message, chat_log, model, summary, on_summary, recall
+    )
+
+    parts = []
+    try:
+        async for delta in engine.ask_llm_stream(messages, model):
+            parts.append(delta)
+            yield delta
+    except asyncio.CancelledError:
+        if parts:
+            chat_log.append(Message("assistant", "".join(parts).strip()))
+        raise
+
+    chat_log.append(Message("assistant", "".join(parts).strip()))
@@ -0,0 +1,72 @@
+"""Compile the system prompt templates into a stable, minified prefix.
+
+Static prompts are dedented, stripped of trailing whitespace and runs of blank
+lines, and joined into one system message that is byte-identical on every
+request, so provider-side prompt prefix caching can reuse it. Volatile content
+such as today's date goes into a separate message sent after the conversation.
+
+Run ``python3 -m app.llm.prompt_compiler`` to see the token size of each part.
+"""
+
+import functools
+import re
+import textwrap
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from .config import DATE_FORMAT, DATE_PROMPT, OPENAI_SYSTEM_PROMPTS, TIMEZONE
+from .message import Message
+
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def minify(text):
+    """Remove indentation, trailing whitespace and repeated blank lines."""
+    lines = [line.rstrip() for line in textwrap.dedent(text).splitlines()]
+    return BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def system_prompt():
+    """Return the compiled static system prompt."""
+    return "\n\n".join(
+        minify(message["content"]) for message in OPENAI_SYSTEM_PROMPTS.values()
+    )
+
+
+def system_message():
+    """Return a new system message carrying the static prompt."""
+    return Message("system", system_prompt())
+
+
+def todays_date():
+    return datetime.now(ZoneInfo(TIMEZONE)).strftime(DATE_FORMAT)
+
+
+def volatile_message():
+    """Return the system message with content that changes between requests."""
+    return Message("system", DATE_PROMPT.format(today=todays_date()))
+
+
+def report():
+    """Return (part, tokens, raw tokens) for each part of the assembled prompt."""
+    from .context_manager import estimate_tokens
+
+    parts = [
+        (f"static: {name}", minify(m["content"]), m["content"])
+        for name, m in OPENAI_SYSTEM_PROMPTS.items()
+    ]
+    volatile = volatile_message().content
+    parts.append(("volatile: date", volatile, volatile))
+    return [
+        (name, estimate_tokens(text), estimate_tokens(raw))
+        for name, text, raw in parts
+    ]
+
+
+if __name__ == "__main__":
+    rows = report()
+    for name, tokens, raw_tokens in rows:
+        print(f"{name:<32} {tokens:6d} tokens (raw {raw_tokens})")
+    total, raw_total = sum(r[1] for r in rows), sum(r[2] for r in rows)
+    print(f"{'total':<32} {total:6d} tokens (raw {raw_total})")
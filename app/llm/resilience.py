@@ -0,0 +1,256 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+import openai
+
+from .config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    ERROR_MESSAGE,
+    HEDGE_ENABLED,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MODEL,
+    HEDGE_PERCENTILE,
+    MAINTENANCE_MESSAGE,
+    OPENAI_BASE_DELAY,
+    OPENAI_JITTER,
+    OPENAI_MAX_DELAY,
+)
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+# The SDK wraps errors raised while sending a request, but a stream that
+# breaks while it is read raises httpx errors directly.
+STREAM_ERRORS = RETRYABLE_ERRORS + (httpx.TransportError,)
+LATENCY_WINDOW = 200
+
+
+class RequestFailed(Exception):
+    """Raised when a request cannot be completed; str(e) is shown to the user."""
+
+
+def backoff_delay(attempt):
+    """Return the exponential backoff delay with jitter for a retry attempt."""
+    delay = min(OPENAI_MAX_DELAY, OPENAI_BASE_DELAY * (2**attempt))
+    return delay + OPENAI_JITTER * random.random()
+
+
+class LatencyTracker:
+    """Rolling per-key latency samples used to derive the hedging threshold."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def threshold(self, key):
+        """Return the latency percentile after which to hedge, or None."""
+        if not HEDGE_ENABLED:
+            return None
+        with self.lock:
+            samples = sorted(self.samples.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * HEDGE_PERCENTILE), len(samples) - 1)]
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, probing again after a cool-down.
+
+    Closed: requests flow. Open: requests are rejected until reset_timeout
+    has passed. Half-open: one probe is let through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.probe_started = None
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+
+    def allow(self):
+        """Return True if a request may be sent now."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            # A probe that never reported back (e.g. it was cancelled) expires.
+            if self.probing and now - self.probe_started < self.reset_timeout:
+                return False
+            self.probing = True
+            self.probe_started = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def failure_message(self):
+        """Return the message to show when a request finally fails."""
+        return MAINTENANCE_MESSAGE if self.is_open() else ERROR_MESSAGE
+
+
+latency_tracker = LatencyTracker()
+circuit_breaker = CircuitBreaker()
+hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+def hedge_model(model):
+    """Return the model used for a hedged duplicate request."""
+    return HEDGE_MODEL or model
+
+
+def timed_call(call, model, key):
+    """Run call(model) and record its latency under key."""
+    started = time.monotonic()
+    result = call(model)
+    latency_tracker.record(key, time.monotonic() - started)
+    return result
+
+
+def hedged_call(call, model):
+    """Run call(model), sending a hedged duplicate if it exceeds the p95 latency.
+
+    Both run in hedge_pool and the first success is returned. The loser cannot
+    be interrupted, so it is abandoned: it finishes in the background and its
+    answer is dropped.
+    """
+    threshold = latency_tracker.threshold(model)
+    if threshold is None:
+        return timed_call(call, model, model)
+    primary = hedge_pool.submit(timed_call, call, model, model)
+    done, _ = wait({primary}, timeout=threshold)
+    if done:
+        return primary.result()
+    hedge = hedge_pool.submit(timed_call, call, hedge_model(model), model)
+    futures, error = {primary, hedge}, None
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in futures:
+                    loser.cancel()
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def timed_call_async(call, model, key):
+    """Await call(model) and record its latency under key."""
+    started = time.monotonic()
+    result = await call(model)
+    latency_tracker.record(key, time.monotonic() - started)
+    return result
+
+
+async def hedged_call_async(call, model):
+    """Await call(model), racing a hedged duplicate past the p95 latency."""
+    threshold = latency_tracker.threshold(model)
+    if threshold is None:
+        return await timed_call_async(call, model, model)
+    primary = asyncio.ensure_future(timed_call_async(call, model, model))
+    done, _ = await asyncio.wait({primary}, timeout=threshold)
+    if done:
+        return primary.result()
+    hedge = asyncio.ensure_future(timed_call_async(call, hedge_model(model), model))
+    tasks, error = {primary, hedge}, None
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def hedged_stream_async(start_stream, model):
+    """Yield from start_stream(model), hedging if the first delta is late.
+
+    The first stream to produce a delta wins; the other one is cancelled and
+    its connection released.
+    """
+    key = f"ttft:{model}"
+    started = time.monotonic()
+    streams = {}
+    primary = start_stream(model)
+    streams[asyncio.ensure_future(primary.__anext__())] = primary
+    threshold = latency_tracker.threshold(key)
+    winner, first, error = None, None, None
+    try:
+        done, _ = await asyncio.wait(set(streams), timeout=threshold)
+        if not done:
+            hedge = start_stream(hedge_model(model))
+            streams[asyncio.ensure_future(hedge.__anext__())] = hedge
+        while streams and winner is None:
+            done, _ = await asyncio.wait(
+                set(streams), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                stream = streams.pop(task)
+                exception = task.exception()
+                if winner is None and (
+                    exception is None or isinstance(exception, StopAsyncIteration)
+                ):
+                    winner = stream
+                    first = None if exception else task.result()
+                else:
+                    error = exception or error
+                    await stream.aclose()
+    finally:
+        for task, stream in streams.items():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            await stream.aclose()
+    if winner is None:
+        raise error
+    latency_tracker.record(key, time.monotonic() - started)
+    try:
+        if first is None:
+            return
+        yield first
+        async for delta in winner:
+            yield delta
+    finally:
+        await winner.aclose()
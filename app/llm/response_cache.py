@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL,
+)
+from .telemetry import telemetry
+
+CACHE_COUNTER = "opal_response_cache_total"
+
+
+def cache_key(model, messages):
+    """Return a canonical hash of a model and its message history."""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": [
+                {"role": m["role"], "content": m["content"]} for m in messages
+            ],
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk response cache with TTL, size-based LRU eviction and single-flight.
+
+    Concurrent identical requests share one API call: the first caller becomes
+    the leader and computes the answer, the others wait for its result.
+    Hits, misses, coalesced requests and evictions are also exported as
+    telemetry counters.
+    """
+
+    def __init__(
+        self,
+        path=RESPONSE_CACHE_PATH,
+        ttl=RESPONSE_CACHE_TTL,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.flights = {}
+        self.async_flights = {}
+        self.touched = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, answer TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self.db.commit()
+        self.total_bytes = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+    def record(self, event, value=1):
+        """Bump a counter both here and in telemetry."""
+        setattr(self, event, getattr(self, event) + value)
+        telemetry.count(CACHE_COUNTER, event, value)
+
+    def get(self, key):
+        """Return a fresh cached answer or None."""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT answer, created, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                # Access times are written with the next put to keep hits cheap.
+                self.touched[key] = now
+                self.record("hits")
+                return row[0]
+            if row:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.db.commit()
+                self.total_bytes -= row[2]
+                self.record("evictions")
+            self.record("misses")
+            return None
+
+    def put(self, key, answer):
+        """Store an answer, evicting least recently used entries over the limit."""
+        now = time.time()
+        size = len(answer.encode("utf-8"))
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self.total_bytes -= row[0]
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, answer, now, now, size),
+            )
+            self.total_bytes += size
+            self.db.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, touched) for touched, accessed in self.touched.items()],
+            )
+            self.touched.clear()
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones over the limit."""
+        expired = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses WHERE created < ?",
+            (time.time() - self.ttl,),
+        ).fetchone()[0]
+        if expired:
+            deleted = self.db.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self.total_bytes -= expired
+            self.record("evictions", deleted)
+        while self.total_bytes > self.max_bytes:
+            row = self.db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self.total_bytes = 0
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+            self.record("evictions")
+
+    def get_or_compute(self, key, compute):
+        """Return a cached answer or compute it once for all concurrent callers.
+
+        compute returns an answer string, or None if it must not be cached.
+        """
+        answer = self.get(key)
+        if answer is not None:
+            return answer
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = {"event": threading.Event()}
+            else:
+                self.record("coalesced")
+        if not leader:
+            flight["event"].wait()
+            if flight.get("answer") is not None:
+                return flight["answer"]
+            return compute()
+        try:
+            answer = compute()
+            flight["answer"] = answer
+            if answer is not None:
+                self.put(key, answer)
+            return answer
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight["event"].set()
+
+    async def join_flight(self, key):
+        """Join an identical in-flight request or become its leader.
+
+        Returns (answer, future). Followers get the leader's answer, or None if
+        it failed, and no future. The leader gets a future it must resolve
+        with finish_flight.
+        """
+        future = self.async_flights.get(key)
+        if future is not None:
+            self.record("coalesced")
+            return await asyncio.shield(future), None
+        future = asyncio.get_running_loop().create_future()
+        self.async_flights[key] = future
+        return None, future
+
+    def finish_flight(self, key, future, answer):
+        """Resolve a leader's flight and store a cacheable answer."""
+        if self.async_flights.get(key) is future:
+            del self.async_flights[key]
+        if not future.done():
+            future.set_result(answer)
+        if answer is not None:
+            try:
+                self.put(key, answer)
+            except sqlite3.Error as e:
+                logging.error(f"Error writing response cache: {e}")
+
+
+response_cache = None
+
+
+def get_response_cache():
+    """Return the shared response cache, or None when caching is disabled."""
+    global response_cache
+    if RESPONSE_CACHE_ENABLED and response_cache is None:
+        try:
+            response_cache = ResponseCache()
+        except sqlite3.Error as e:
+            logging.error(f"Response cache unavailable: {e}")
+    return response_cache
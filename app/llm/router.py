@@ -0,0 +1,126 @@
+"""Pick a backend per request for the "Auto" model.
+
+Each request is classed as quick, normal or heavy from its text and budgeted
+prompt size. Questions (wrapped in parentheses) and low V=/T= levels are
+quick, high levels and otherwise large prompts are heavy. Quick questions go
+to the fastest healthy backend, normal ones to DEFAULT_MODEL and only heavy
+ones to SLOW_MODEL, or to DEFAULT_MODEL if the prompt does not fit it. Backends that keep failing are skipped for a cool-down.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+
+from .config import (
+    AUTO_MODEL,
+    CIRCUIT_RESET_TIMEOUT,
+    DEFAULT_MODEL,
+    MODEL_BASE_URLS,
+    OPENAI_MODELS,
+    ROUTER_HEAVY_LEVEL,
+    ROUTER_HEAVY_TOKENS,
+    ROUTER_LIGHT_LEVEL,
+    ROUTER_MAX_ERROR_RATE,
+    ROUTER_WINDOW,
+    SLOW_MODEL,
+)
+from .context_manager import context_budget
+
+LEVEL_PREFIX = re.compile(r"\s*([VT])=(\d)")
+
+
+def levels(text):
+    """Return the V= and T= levels given at the start of a message."""
+    found, position = {}, 0
+    while True:
+        match = LEVEL_PREFIX.match(text, position)
+        if not match:
+            return found
+        found[match.group(1)] = int(match.group(2))
+        position = match.end()
+
+
+def classify(text, prompt_tokens):
+    """Return "quick", "normal" or "heavy" for a user message.
+
+    Explicit markers win over the prompt size, so a parenthesized question in
+    a long chat is still quick.
+    """
+    given = levels(text)
+    question = LEVEL_PREFIX.sub("", text).strip()
+    if any(level >= ROUTER_HEAVY_LEVEL for level in given.values()):
+        return "heavy"
+    if question.startswith("(") and question.endswith(")"):
+        return "quick"
+    if given and all(level <= ROUTER_LIGHT_LEVEL for level in given.values()):
+        return "quick"
+    if prompt_tokens >= ROUTER_HEAVY_TOKENS:
+        return "heavy"
+    return "normal"
+
+
+class BackendStats:
+    """Recent latency and outcomes of each backend."""
+
+    def __init__(self, window=ROUTER_WINDOW):
+        self.window = window
+        self.latencies = {}
+        self.outcomes = {}
+        self.last_failure = {}
+        self.lock = threading.Lock()
+
+    def record(self, model, seconds, failed=False):
+        with self.lock:
+            self.outcomes.setdefault(model, deque(maxlen=self.window)).append(failed)
+            if failed:
+                self.last_failure[model] = time.monotonic()
+            else:
+                self.latencies.setdefault(model, deque(maxlen=self.window)).append(
+                    seconds
+                )
+
+    def latency(self, model):
+        """Return the median recent latency, or 0 for an untried backend."""
+        with self.lock:
+            samples = sorted(self.latencies.get(model, ()))
+        return samples[len(samples) // 2] if samples else 0.0
+
+    def healthy(self, model):
+        """Return False while a backend fails too often and failed recently."""
+        with self.lock:
+            outcomes = self.outcomes.get(model, ())
+            if len(outcomes) < 3 or sum(outcomes) / len(outcomes) <= ROUTER_MAX_ERROR_RATE:
+                return True
+            return time.monotonic() - self.last_failure[model] > CIRCUIT_RESET_TIMEOUT
+
+
+backend_stats = BackendStats()
+
+
+def candidates(prompt_tokens):
+    """Return the healthy backends whose context budget fits the prompt."""
+    models = [m for m in OPENAI_MODELS if m in MODEL_BASE_URLS]
+    fitting = [m for m in models if context_budget(m) >= prompt_tokens] or models
+    return [m for m in fitting if backend_stats.healthy(m)] or fitting
+
+
+def route(text, prompt_tokens):
+    """Return the model to send a message to.
+
+    prompt_tokens is the budgeted prompt size from context_tokens. A heavy
+    request whose prompt SLOW_MODEL cannot fit goes to DEFAULT_MODEL.
+    """
+    available = candidates(prompt_tokens)
+    kind = classify(text, prompt_tokens)
+    if kind == "heavy" and SLOW_MODEL in available:
+        return SLOW_MODEL
+    if kind != "quick" and DEFAULT_MODEL in available:
+        return DEFAULT_MODEL
+    light = [m for m in available if m != SLOW_MODEL] or available
+    return min(light, key=backend_stats.latency)
+
+
+def resolve(model, text, prompt_tokens):
+    """Return model, or the routed backend if model is AUTO_MODEL."""
+    return route(text, prompt_tokens) if model == AUTO_MODEL else model
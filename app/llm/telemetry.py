@@ -0,0 +1,186 @@
+import bisect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .router import backend_stats
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+HISTOGRAMS = {
+    "opal_llm_queue_wait_seconds": "Time a request waited for a worker.",
+    "opal_llm_ttft_seconds": "Time to the first streamed token.",
+    "opal_llm_latency_seconds": "Total request latency including retries.",
+}
+COUNTERS = {
+    "opal_llm_requests_total": "Requests sent, by model.",
+    "opal_llm_errors_total": "Requests that failed after all retries.",
+    "opal_llm_retries_total": "Retried attempts.",
+    "opal_llm_prompt_tokens_total": "Prompt tokens reported by the API.",
+    "opal_llm_completion_tokens_total": "Completion tokens reported by the API.",
+    "opal_http_requests_total": "HTTP requests sent, by host.",
+    "opal_http_connections_total": "HTTP connections opened, by host.",
+    "opal_response_cache_total": "Response cache events, by kind.",
+}
+COUNTER_LABELS = {
+    "opal_http_requests_total": "host",
+    "opal_http_connections_total": "host",
+    "opal_response_cache_total": "event",
+}
+
+
+class Histogram:
+    """Cumulative bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of its bucket."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Telemetry:
+    """In-process registry of LLM request metrics, broken down by model."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.counters = {name: {} for name in COUNTERS}
+
+    def observe(self, name, model, value):
+        with self.lock:
+            self.histograms[name].setdefault(model, Histogram()).observe(value)
+
+    def count(self, name, model, value=1):
+        with self.lock:
+            self.counters[name][model] = self.counters[name].get(model, 0) + value
+
+    def record_usage(self, model, usage):
+        """Record token counts from a response's usage object."""
+        if usage is None:
+            return
+        self.count("opal_llm_prompt_tokens_total", model, usage.prompt_tokens or 0)
+        self.count(
+            "opal_llm_completion_tokens_total", model, usage.completion_tokens or 0
+        )
+
+    def render_prometheus(self):
+        """Export all metrics in the Prometheus text format."""
+        lines = []
+        with self.lock:
+            for name, help_text in COUNTERS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                label = COUNTER_LABELS.get(name, "model")
+                for key, value in sorted(self.counters[name].items()):
+                    lines.append(f'{name}{{{label}="{key}"}} {value}')
+            for name, help_text in HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for model, histogram in sorted(self.histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(
+                        list(histogram.buckets) + ["+Inf"], histogram.counts
+                    ):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{model="{model}",le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(f'{name}_sum{{model="{model}"}} {histogram.sum}')
+                    lines.append(f'{name}_count{{model="{model}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Return a one-line summary per model for the status bar."""
+        parts = []
+        with self.lock:
+            for model, latency in sorted(
+                self.histograms["opal_llm_latency_seconds"].items()
+            ):
+                ttft = self.histograms["opal_llm_ttft_seconds"].get(model)
+                tokens = self.counters["opal_llm_prompt_tokens_total"].get(
+                    model, 0
+                ) + self.counters["opal_llm_completion_tokens_total"].get(model, 0)
+                text = f"{model}: {latency.count} req, p50 {latency.quantile(0.5)}s"
+                if ttft and ttft.count:
+                    text += f", TTFT p50 {ttft.quantile(0.5)}s"
+                parts.append(f"{text}, {tokens} tok")
+            for host, requests in sorted(
+                self.counters["opal_http_requests_total"].items()
+            ):
+                opened = self.counters["opal_http_connections_total"].get(host, 0)
+                parts.append(f"{host}: {opened} conn, {requests - opened} reused")
+        return " | ".join(parts)
+
+
+telemetry = Telemetry()
+
+
+class RequestTimer:
+    """Track one request's latency, time-to-first-token and outcome."""
+
+    def __init__(self, model):
+        self.model = model
+        self.started = time.monotonic()
+        self.first_token = None
+        telemetry.count("opal_llm_requests_total", model)
+
+    def token(self):
+        """Mark the arrival of a streamed delta."""
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+            telemetry.observe(
+                "opal_llm_ttft_seconds", self.model, self.first_token - self.started
+            )
+
+    def finish(self, failed=False):
+        finished = time.monotonic()
+        telemetry.observe("opal_llm_latency_seconds", self.model, finished - self.started)
+        if failed:
+            telemetry.count("opal_llm_errors_total", self.model)
+        # The router compares streamed backends by time to first token.
+        responded = self.first_token or finished
+        backend_stats.record(self.model, responded - self.started, failed)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = telemetry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a local port from a daemon thread."""
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logging.error(f"Could not start metrics endpoint on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,111 @@
+"""Tuned httpx clients shared by the OpenAI SDK clients.
+
+Connections use HTTP/2 when the h2 package is installed and are kept alive for
+HTTP_KEEPALIVE_EXPIRY, so requests after an idle period reuse them. warm_up
+opens a connection ahead of the first request. Every request is counted per
+host along with the connections it had to open, and the difference is the
+number of reused connections.
+"""
+
+import logging
+import time
+
+import httpx
+
+from .config import (
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_READ_TIMEOUT,
+    HTTP_WARM_UP_INTERVAL,
+    OPENAI_MAX_CONNECTIONS,
+)
+from .telemetry import telemetry
+
+CONNECT_EVENT = "connection.connect_tcp.started"
+
+warmed_at = {}
+
+
+def http2_available():
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logging.warning("h2 is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def client_options():
+    """Return the keyword arguments shared by the sync and async clients."""
+    return {
+        "http2": http2_available(),
+        "limits": httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
+def count_request(request):
+    host = request.url.host
+    telemetry.count("opal_http_requests_total", host)
+
+    def trace(event, info):
+        if event == CONNECT_EVENT:
+            telemetry.count("opal_http_connections_total", host)
+
+    request.extensions["trace"] = trace
+
+
+async def count_request_async(request):
+    host = request.url.host
+    telemetry.count("opal_http_requests_total", host)
+
+    async def trace(event, info):
+        if event == CONNECT_EVENT:
+            telemetry.count("opal_http_connections_total", host)
+
+    request.extensions["trace"] = trace
+
+
+def create_http_client():
+    return httpx.Client(event_hooks={"request": [count_request]}, **client_options())
+
+
+def create_async_http_client():
+    return httpx.AsyncClient(
+        event_hooks={"request": [count_request_async]}, **client_options()
+    )
+
+
+def warm_up_due(base_url):
+    """Return True and note the time if base_url was not warmed up recently."""
+    now = time.monotonic()
+    if now - warmed_at.get(base_url, -HTTP_WARM_UP_INTERVAL) < HTTP_WARM_UP_INTERVAL:
+        return False
+    warmed_at[base_url] = now
+    return True
+
+
+def warm_up(http_client, base_url):
+    """Open a pooled connection to base_url with a cheap HEAD request."""
+    if not warm_up_due(base_url):
+        return
+    try:
+        http_client.head(base_url)
+    except httpx.HTTPError as e:
+        logging.debug(f"Connection warm-up to {base_url} failed: {e}")
+
+
+async def warm_up_async(http_client, base_url):
+    if not warm_up_due(base_url):
+        return
+    try:
+        await http_client.head(base_url)
+    except httpx.HTTPError as e:
+        logging.debug(f"Connection warm-up to {base_url} failed: {e}")
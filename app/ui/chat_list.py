@@ -0,0 +1,118 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+FETCH_SIZE = 200  # sidebar rows materialized per fetchMore
+
+
+class ChatListModel(QAbstractListModel):
+    """Chat names for the sidebar, most recently active first.
+
+    ``rows`` maps every name to its row, so finding a chat is O(1) however
+    many there are. Only the first ``loaded`` rows are exposed to the view;
+    the rest are handed out through fetchMore as the user scrolls.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.rows = {}
+        self.loaded = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.names[index.row()]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.names)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_SIZE, len(self.names) - self.loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def set_chats(self, names):
+        """Replace the list with names, given most recent first."""
+        self.beginResetModel()
+        self.names = list(dict.fromkeys(names))
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.loaded = min(FETCH_SIZE, len(self.names))
+        self.endResetModel()
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def name(self, row):
+        return self.names[row]
+
+    def index_of(self, name):
+        """Return the model index of a chat, loading rows up to it if needed."""
+        row = self.rows.get(name)
+        if row is None:
+            return QModelIndex()
+        while row >= self.loaded:
+            self.fetchMore()
+        return self.index(row)
+
+    def next_name(self, name):
+        """Return the chat after name, wrapping around to the first one."""
+        if not self.names:
+            return None
+        row = self.rows.get(name, -1)
+        return self.names[(row + 1) % len(self.names)]
+
+    def reindex(self, start, end):
+        for row in range(start, end):
+            self.rows[self.names[row]] = row
+
+    def touch(self, name):
+        """Move a chat to the top, adding it if it is new."""
+        row = self.rows.get(name)
+        if row == 0:
+            return
+        if row is None:
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self.names.insert(0, name)
+            self.loaded += 1
+            self.reindex(0, len(self.names))
+            self.endInsertRows()
+            return
+        self.index_of(name)
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), 0)
+        self.names.insert(0, self.names.pop(row))
+        self.reindex(0, row + 1)
+        self.endMoveRows()
+
+    def remove(self, name):
+        """Remove a chat from the list."""
+        row = self.rows.get(name)
+        if row is None:
+            return
+        if row >= self.loaded:
+            del self.names[row]
+        else:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.names[row]
+            self.loaded -= 1
+            self.endRemoveRows()
+        del self.rows[name]
+        self.reindex(row, len(self.names))
+
+    def rename(self, old_name, new_name):
+        """Rename a chat in place, replacing any chat already called new_name."""
+        if new_name in self.rows and new_name != old_name:
+            self.remove(new_name)
+        row = self.rows.pop(old_name, None)
+        if row is None:
+            self.touch(new_name)
+            return
+        self.names[row] = new_name
+        self.rows[new_name] = row
+        if row < self.loaded:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
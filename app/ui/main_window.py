@@ -1,15 +1,19 @@
 import os
+import sys
 import json
-import markdown
+import asyncio
+import sqlite3
 import threading
+import time
+import importlib
 from PyQt5.QtWidgets import (
     QMainWindow,
     QVBoxLayout,
     QHBoxLayout,
-    QTextEdit,
     QPushButton,
-    QLabel,
+    QListView,
     QListWidget,
+    QListWidgetItem,
     QComboBox,
     QWidget,
     QShortcut,
@@ -18,30 +22,57 @@ from PyQt5.QtWidgets import (
     QAction,
     QMenu,
 )
-from PyQt5.QtGui import (
-    QFont,
-    QKeySequence,
-    QTextCursor,
-    QTextFrameFormat,
-    QTextCharFormat,
-    QColor,
-)
-from PyQt5.QtCore import Qt, pyqtSlot
+from PyQt5.QtGui import QFont, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot
 
-from app.core.bot_thread import BotThread
+from app.core.bot_task import BotTask
+from app.core.chat_index import ChatIndex
+from app.core.chat_store import ChatStore
+from app.core.chat_writer import ChatWriter
 from app.core.custom_text_edit import CustomTextEdit
+from app.core.scheduler import ChatScheduler
+from app.core.search_index import SearchIndex
+from app.core.startup_profile import startup_profile
 from app.core.status_label import StatusLabel
-from app.llm.config import DEFAULT_MODEL, OPENAI_MODELS, OPENAI_SYSTEM_MESSAGE
+from app.ui.chat_list import ChatListModel
+from app.ui.transcript_view import TranscriptView
+from app.llm.config import (
+    AUTO_MODEL,
+    CHAT_ARCHIVE_AFTER_DAYS,
+    DEFAULT_MODEL,
+    HTTP_WARM_UP_INTERVAL,
+    OPENAI_MODELS,
+)
+from app.llm.message import ChatHistory, Message
+from app.llm.prompt_compiler import system_message
+
+# Loaded on a background thread once the window has painted.
+WARM_UP_MODULES = ("app.llm.process_message", "markdown")
+CYCLE_SWITCH_DELAY = 150  # ms without Ctrl+B before the selected chat renders
 
 
 class OpalApp(QMainWindow):
+    started = pyqtSignal()  # history loaded after the first paint
+
     def __init__(self):
         super().__init__()
+        self.painted = False
         self.mutex = threading.Lock()
-        self.bot_thread_per_chat = {}
-        self.chat_log = {"(New Chat)": []}
+        self.bot_tasks = set()
+        self.scheduler = ChatScheduler()
+        self.stream_buffers = {}
+        self.warmed_at = None
+        self.chat_log = {"(New Chat)": ChatHistory()}
+        self.chat_summaries = {}
         self.current_chat = "(New Chat)"
         self.CHAT_LOG_DIR = "app/.chat_logs"
+        self.chat_store = ChatStore(self.CHAT_LOG_DIR)
+        self.chat_index = ChatIndex(self.chat_store)
+        self.search_index = self.create_search_index()
+        self.chat_writer = ChatWriter(
+            self.chat_store,
+            on_appended=self.search_index.add_messages if self.search_index else None,
+        )
         self.is_dark_mode = True
         self.sidebar_width = 140
         self.init_ui()
@@ -55,9 +86,66 @@ class OpalApp(QMainWindow):
         self.create_layouts()
         self.connect_signals()
         self.setCentralWidget(self.main_widget)
-        self.load_chat_history()
         self.apply_ui_settings()
 
+    def paintEvent(self, event):
+        """Finish start-up once the first frame is on screen."""
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            startup_profile.mark("first paint")
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Load chat history and warm up heavy modules after the first paint."""
+        self.load_chat_history()
+        startup_profile.mark("chat history loaded")
+        threading.Thread(target=self.warm_up, daemon=True).start()
+        threading.Thread(target=self.compact_storage, daemon=True).start()
+        self.started.emit()
+
+    def warm_up(self):
+        """Import the LLM client stack ahead of the first request."""
+        for module in WARM_UP_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                print(f"Error warming up {module}: {e}")
+
+    def warm_connection(self):
+        """Open the API connection when the user starts typing after a pause.
+
+        Runs on focus and on edits, but at most once per HTTP_WARM_UP_INTERVAL,
+        so typing costs a timestamp check per keystroke.
+        """
+        now = time.monotonic()
+        if self.warmed_at is not None and now - self.warmed_at < HTTP_WARM_UP_INTERVAL:
+            return
+        # The warm-up thread may still be importing the module.
+        engine = getattr(sys.modules.get("app.llm.process_message"), "engine", None)
+        if engine is None:
+            return
+        self.warmed_at = now
+        model = self.model_selector.currentText()
+        if model == AUTO_MODEL:
+            model = DEFAULT_MODEL
+        asyncio.ensure_future(engine.warm_up(model))
+
+    def compact_storage(self):
+        """Deduplicate prompts and archive idle chats in the background."""
+        try:
+            self.chat_store.compact(CHAT_ARCHIVE_AFTER_DAYS * 24 * 60 * 60)
+        except OSError as e:
+            print(f"Error compacting chat storage: {e}")
+
+    def create_search_index(self):
+        """Open the full-text search index, or return None if unavailable."""
+        try:
+            return SearchIndex(self.CHAT_LOG_DIR)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error opening search index: {e}")
+            return None
+
     def apply_ui_settings(self):
         """Apply UI settings such as hiding panels and setting the stylesheet."""
         self.hide_panels()
@@ -65,7 +153,9 @@ class OpalApp(QMainWindow):
 
     def hide_panels(self):
         """Hide UI panels based on certain conditions."""
-        self.chats_list_widget.hide()
+        self.search_input.hide()
+        self.search_results_widget.hide()
+        self.chats_list_view.hide()
         self.model_selector.hide()
         self.new_chat_button.hide()
         self.rename_chat_button.hide()
@@ -87,6 +177,7 @@ class OpalApp(QMainWindow):
         self.mode_toggle_button.setText(
             "Light Mode" if self.is_dark_mode else "Dark Mode"
         )
+        self.chat_log_display.set_dark_mode(self.is_dark_mode)
 
     def create_shortcuts(self):
         """Create keyboard shortcuts for the application."""
@@ -97,7 +188,7 @@ class OpalApp(QMainWindow):
             "Ctrl+Tab": self.toggle_left_panel,
             "Ctrl+B": self.cycle_through_chats,
             "Ctrl+T": self.toggle_mode,
-            "Esc": self.close,
+            "Esc": self.cancel_or_close,
             "Ctrl+Q": self.close,
         }
         for key_sequence, func in shortcuts.items():
@@ -121,20 +212,37 @@ class OpalApp(QMainWindow):
         self.rename_chat_button = self.create_button("Rename Chat", font)
         self.delete_chat_button = self.create_button("Delete Chat", font)
         self.send_button = self.create_button("Send", font)
-
-        self.chats_list_widget = self.create_list_widget(font)
-        self.chat_log_display = self.create_text_edit(font, read_only=True)
+        self.stop_button = self.create_button("Stop", font)
+        self.stop_button.setEnabled(False)
+
+        self.search_input = QLineEdit()
+        self.search_input.setFont(font)
+        self.search_input.setPlaceholderText("Search chats...")
+        self.search_input.setEnabled(self.search_index is not None)
+        self.search_results_widget = QListWidget()
+        self.search_results_widget.setFont(font)
+        self.search_results_widget.setWordWrap(True)
+        self.search_results_widget.hide()
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.chat_list_model = ChatListModel(self)
+        self.chats_list_view = self.create_chat_list_view(font)
+        self.pending_chat = None
+        self.switch_timer = QTimer(self)
+        self.switch_timer.setSingleShot(True)
+        self.switch_timer.timeout.connect(self.switch_to_pending_chat)
+        self.chat_log_display = self.create_transcript_view(font)
         self.chat_input = self.create_custom_text_edit(font)
 
-        self.model_selector = self.create_combo_box(font, OPENAI_MODELS)
+        self.model_selector = self.create_combo_box(font, [AUTO_MODEL] + OPENAI_MODELS)
 
         self.status_label = StatusLabel()
         self.status_label.setFont(font)
 
-        self.chats_list_widget.addItem("(New Chat)")
-        self.chats_list_widget.setCurrentRow(0)
-        self.chats_list_widget.setMaximumWidth(200)
-        self.chats_list_widget.setMinimumWidth(200)
+        self.chat_list_model.touch("(New Chat)")
+        self.chats_list_view.setMaximumWidth(200)
+        self.chats_list_view.setMinimumWidth(200)
 
     def create_layouts(self):
         """Create and configure the layouts for the UI."""
@@ -153,7 +261,9 @@ class OpalApp(QMainWindow):
         """Create the left layout for the sidebar."""
         layout = QVBoxLayout()
         layout.addWidget(self.toggle_button)
-        layout.addWidget(self.chats_list_widget)
+        layout.addWidget(self.search_input)
+        layout.addWidget(self.search_results_widget)
+        layout.addWidget(self.chats_list_view)
         layout.addWidget(self.model_selector)
         layout.addWidget(self.new_chat_button)
         layout.addWidget(self.rename_chat_button)
@@ -170,19 +280,22 @@ class OpalApp(QMainWindow):
             button.clicked.connect(callback)
         return button
 
-    def create_list_widget(self, font):
-        """Helper method to create a QListWidget."""
-        list_widget = QListWidget()
-        list_widget.setFont(font)
-        list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        list_widget.customContextMenuRequested.connect(self.show_chat_context_menu)
-        return list_widget
-
-    def create_text_edit(self, font, read_only=False):
-        """Helper method to create a QTextEdit."""
-        text_edit = QTextEdit(readOnly=read_only)
-        text_edit.setFont(font)
-        return text_edit
+    def create_chat_list_view(self, font):
+        """Helper method to create the sidebar view over the chat list model."""
+        list_view = QListView()
+        list_view.setObjectName("chats")
+        list_view.setFont(font)
+        list_view.setModel(self.chat_list_model)
+        list_view.setUniformItemSizes(True)
+        list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        list_view.customContextMenuRequested.connect(self.show_chat_context_menu)
+        return list_view
+
+    def create_transcript_view(self, font):
+        """Helper method to create a TranscriptView."""
+        transcript_view = TranscriptView()
+        transcript_view.setFont(font)
+        return transcript_view
 
     def create_custom_text_edit(self, font):
         """Helper method to create a CustomTextEdit."""
@@ -205,6 +318,7 @@ class OpalApp(QMainWindow):
         layout.addWidget(self.chat_log_display)
         layout.addWidget(self.chat_input)
         layout.addWidget(self.send_button)
+        layout.addWidget(self.stop_button)
         layout.addWidget(self.status_label)
         return layout
 
@@ -216,15 +330,19 @@ class OpalApp(QMainWindow):
         return sidebar_widget
 
     def toggle_left_panel(self):
-        if self.chats_list_widget.isVisible():
-            self.chats_list_widget.hide()
+        if self.chats_list_view.isVisible():
+            self.search_input.hide()
+            self.search_results_widget.hide()
+            self.chats_list_view.hide()
             self.model_selector.hide()
             self.new_chat_button.hide()
             self.rename_chat_button.hide()
             self.delete_chat_button.hide()
             self.toggle_button.setText(">")
         else:
-            self.chats_list_widget.show()
+            self.search_input.show()
+            self.search_results_widget.setVisible(bool(self.search_input.text()))
+            self.chats_list_view.show()
             self.model_selector.show()
             self.new_chat_button.show()
             self.rename_chat_button.show()
@@ -242,13 +360,20 @@ class OpalApp(QMainWindow):
         """Connect signals to the appropriate slots."""
         self.toggle_button.clicked.connect(self.toggle_left_panel)
         self.send_button.clicked.connect(self.send_message)
+        self.stop_button.clicked.connect(self.cancel_request)
         self.chat_input.returnPressed.connect(self.send_message)
+        self.chat_input.textChanged.connect(self.warm_connection)
+        self.chat_input.focused.connect(self.warm_connection)
         self.new_chat_button.clicked.connect(self.create_new_chat)
         self.rename_chat_button.clicked.connect(self.rename_current_chat)
         self.delete_chat_button.clicked.connect(self.delete_current_chat)
-        self.chats_list_widget.currentItemChanged.connect(
-            lambda new_item, _: self.switch_chat(
-                new_item.text() if new_item else "(New Chat)"
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_results_widget.itemActivated.connect(self.open_search_result)
+        self.search_results_widget.itemClicked.connect(self.open_search_result)
+        self.chats_list_view.selectionModel().currentChanged.connect(
+            lambda index, _: self.request_switch(
+                index.data() if index.isValid() else "(New Chat)"
             )
         )
 
@@ -259,72 +384,160 @@ class OpalApp(QMainWindow):
         self.chat_input.clear()
         if not user_message:
             return
-        self.status_label.setText("Status: Typing...")
-        self.post_message(user_message, "user")
+        self.status_label.set_status("Status: Typing...")
+        message = Message("user", user_message)
+        self.update_ui(message)
         selected_model = self.model_selector.currentText()
         with self.mutex:
-            if self.current_chat not in self.chat_log:
-                self.chat_log[self.current_chat] = [OPENAI_SYSTEM_MESSAGE]
-            self.chat_log[self.current_chat].append(
-                {"role": "user", "content": user_message}
+            chat_log = self.chat_log.setdefault(self.current_chat, ChatHistory())
+            bot_task = BotTask(
+                self.current_chat,
+                message,
+                chat_log,
+                selected_model,
+                summary=self.get_summary(self.current_chat),
+                recall=self.search_index.recall if self.search_index else None,
             )
-            if self.current_chat not in self.bot_thread_per_chat:
-                self.bot_thread_per_chat[self.current_chat] = BotThread(
-                    user_message, self.chat_log[self.current_chat], selected_model
-                )
-                self.bot_thread_per_chat[self.current_chat].new_message.connect(
-                    self.post_message
-                )
-                self.bot_thread_per_chat[self.current_chat].finished.connect(
-                    self.reset_status
-                )
-            else:
-                self.bot_thread_per_chat[self.current_chat].user_message = user_message
-                self.bot_thread_per_chat[self.current_chat].chat_log = self.chat_log[
-                    self.current_chat
-                ]
-                self.bot_thread_per_chat[
-                    self.current_chat
-                ].selected_model = selected_model
-            self.bot_thread_per_chat[self.current_chat].start()
-
-    def post_message(self, message, sender="user", url=""):
-        """Post a message to the chat log."""
-        with self.mutex:
-            if self.current_chat not in self.chat_log:
-                self.chat_log[self.current_chat] = [OPENAI_SYSTEM_MESSAGE]
-            elif not isinstance(self.chat_log[self.current_chat], list):
-                self.chat_log[self.current_chat] = [self.chat_log[self.current_chat]]
-            self.chat_log[self.current_chat].append(
-                {"role": sender, "content": message}
+        bot_task.new_message.connect(self.record_message)
+        bot_task.new_delta.connect(self.stream_delta)
+        bot_task.summary_updated.connect(self.save_summary)
+        bot_task.finished.connect(lambda: self.finish_task(bot_task))
+        self.bot_tasks.add(bot_task)
+        bot_task.start(self.scheduler)
+        self.update_stop_button()
+
+    def cancel_request(self):
+        """Cancel the current chat's requests, keeping any partial reply."""
+        for bot_task in self.bot_tasks:
+            if bot_task.chat_name == self.current_chat:
+                bot_task.cancel()
+        self.update_stop_button()
+
+    def cancel_or_close(self):
+        """Cancel the current chat's requests, or close the window if it has none."""
+        if self.stop_button.isEnabled():
+            self.cancel_request()
+        else:
+            self.close()
+
+    def update_stop_button(self):
+        self.stop_button.setEnabled(
+            any(
+                bot_task.chat_name == self.current_chat and not bot_task.cancelled
+                for bot_task in self.bot_tasks
             )
-        self.save_chat_history(
-            self.current_chat, {"role": sender, "content": message, "url": url}
         )
-        self.update_ui(message, sender, url)
+
+    def get_summary(self, chat):
+        """Return the rolling summary of a chat once prefetch_summary loaded it."""
+        return self.chat_summaries.get(chat)
+
+    def prefetch_summary(self, chat):
+        """Load a chat's rolling summary on the writer thread, off the GUI thread."""
+        if chat not in self.chat_summaries:
+            self.chat_writer.call(self.load_summary, chat)
+
+    def load_summary(self, chat):
+        # Runs on the writer thread; a summary saved meanwhile is newer.
+        self.chat_summaries.setdefault(chat, self.chat_store.load_summary(chat))
+
+    def save_summary(self, chat, summary):
+        """Keep and persist an updated rolling summary."""
+        if chat not in self.chat_log:
+            return
+        self.chat_summaries[chat] = summary
+        self.chat_writer.save_summary(chat, summary)
+
+    def finish_task(self, bot_task):
+        """Forget a finished request and reset the status once all are done."""
+        self.bot_tasks.discard(bot_task)
+        # A request cancelled before its first delta leaves an empty stream.
+        if self.stream_buffers.pop(bot_task.chat_name, None) is not None:
+            if bot_task.chat_name == self.current_chat:
+                self.discard_stream()
+        self.update_stop_button()
+        engine = getattr(sys.modules.get("app.llm.process_message"), "engine", None)
+        if engine is not None:
+            asyncio.ensure_future(self.update_metrics(engine))
+        if not self.bot_tasks:
+            self.reset_status()
+
+    async def update_metrics(self, engine):
+        """Show the engine's metrics; in daemon mode they live in the daemon."""
+        self.status_label.set_metrics(await engine.metrics())
+
+    def record_message(self, chat, message):
+        """Persist a message a request added to a chat's history.
+
+        User messages are shown when sent; replies are shown here, in the chat
+        their request came from. Messages of a chat deleted meanwhile are
+        dropped, so they do not bring it back.
+        """
+        if chat not in self.chat_log:
+            return
+        self.save_chat_history(chat, message)
+        self.chat_list_model.touch(chat)
+        if message.role != "assistant":
+            return
+        self.stream_buffers.pop(chat, None)
+        if chat == self.current_chat:
+            self.discard_stream()
+            self.update_ui(message)
+
+    def stream_delta(self, chat, delta):
+        """Append a streamed delta to the in-progress reply of a chat."""
+        if chat not in self.chat_log:
+            return
+        self.stream_buffers[chat] = self.stream_buffers.get(chat, "") + delta
+        if chat == self.current_chat:
+            self.chat_log_display.append_stream(delta)
+
+    def discard_stream(self):
+        """Remove the in-progress streamed message once the full reply arrives."""
+        self.chat_log_display.discard_stream()
+
+    def run_search(self):
+        """Show ranked search results for the text in the search box."""
+        query = self.search_input.text().strip()
+        self.search_results_widget.clear()
+        if not query or self.search_index is None:
+            self.search_results_widget.hide()
+            return
+        for chat, position, role, snippet in self.search_index.search(query):
+            sender = "Me" if role == "user" else "Opal"
+            item = QListWidgetItem(f"{chat}\n{sender}: {snippet}")
+            item.setData(Qt.UserRole, (chat, position))
+            self.search_results_widget.addItem(item)
+        self.search_results_widget.show()
+
+    def open_search_result(self, item):
+        """Open the chat of a search result scrolled to the matching message."""
+        chat, position = item.data(Qt.UserRole)
+        if chat != self.current_chat:
+            self.switch_chat(chat)
+        self.chat_log_display.scroll_to_message(position)
 
     def reset_status(self):
         """Reset the status label to ready."""
-        self.status_label.setText("Status: Ready")
+        self.status_label.set_status("Status: Ready")
 
     def create_new_chat(self):
         """Create a new chat."""
         chat_name = "(New Chat)"
-        self.chats_list_widget.addItem(chat_name)
-        self.chat_log[chat_name] = []
+        self.chat_list_model.touch(chat_name)
+        self.chat_log[chat_name] = ChatHistory()
         self.switch_chat(chat_name)
         self.chat_input.setFocus()
 
     def rename_current_chat(self):
         """Rename the current chat."""
-        current_item = self.chats_list_widget.currentItem()
-        if current_item:
-            dialog = self.create_rename_dialog(current_item.text())
+        if self.current_chat in self.chat_list_model:
+            dialog = self.create_rename_dialog(self.current_chat)
             result = dialog.exec_()
             if result == QDialog.Accepted:
                 new_name = dialog.new_name_input.text()
                 if new_name:
-                    self.rename_chat(current_item, new_name)
+                    self.rename_chat(self.current_chat, new_name)
 
     def create_rename_dialog(self, current_name):
         """Create a dialog to rename the chat."""
@@ -344,63 +557,97 @@ class OpalApp(QMainWindow):
         cancel_button.clicked.connect(dialog.reject)
         return dialog
 
-    def rename_chat(self, current_item, new_name):
+    def rename_chat(self, old_name, new_name):
         """Rename a chat in the chat log and update the UI."""
-        old_name = current_item.text()
-        current_item.setText(new_name)
-        self.chat_log[new_name] = self.chat_log.pop(old_name, [])
+        self.chat_list_model.rename(old_name, new_name)
+        self.chat_log[new_name] = self.chat_log.pop(old_name, ChatHistory())
+        self.chat_summaries.pop(new_name, None)
+        if old_name in self.chat_summaries:
+            self.chat_summaries[new_name] = self.chat_summaries.pop(old_name)
+        self.scheduler.rename(old_name, new_name)
+        for bot_task in self.bot_tasks:
+            if bot_task.chat_name == old_name:
+                bot_task.chat_name = new_name
+        if old_name in self.stream_buffers:
+            self.stream_buffers[new_name] = self.stream_buffers.pop(old_name)
         self.switch_chat(new_name)
         self.update_chat_log_file(old_name, new_name)
+        self.prefetch_summary(new_name)  # queued after the rename
 
     def update_chat_log_file(self, old_name, new_name):
         """Update the chat log file to reflect the new chat name."""
-        old_chat_log_path = os.path.join(self.CHAT_LOG_DIR, f"{old_name}.json")
-        new_chat_log_path = os.path.join(self.CHAT_LOG_DIR, f"{new_name}.json")
+        self.chat_writer.call(self.rename_stored_chat, old_name, new_name)
+
+    def rename_stored_chat(self, old_name, new_name):
+        """Rename a chat on disk; runs on the writer thread."""
         try:
-            with open(old_chat_log_path, "r") as f:
-                old_chat_log = json.load(f)
-                with open(new_chat_log_path, "w") as f:
-                    json.dump(old_chat_log, f)
-            if os.path.exists(old_chat_log_path):
-                os.remove(old_chat_log_path)
-        except (FileNotFoundError, json.JSONDecodeError, Exception) as e:
+            with self.mutex:
+                self.chat_store.rename(old_name, new_name)
+                self.chat_index.rename(old_name, new_name)
+            if self.search_index is not None:
+                self.search_index.rename(old_name, new_name)
+        except (FileNotFoundError, Exception) as e:
             print(f"Error updating chat log file: {e}")
 
+    def delete_stored_chat(self, chat_name):
+        """Delete a chat from disk; runs on the writer thread."""
+        with self.mutex:
+            self.chat_store.delete(chat_name)
+            self.chat_index.remove(chat_name)
+        if self.search_index is not None:
+            self.search_index.delete(chat_name)
+
     def switch_chat(self, chat_name, update_ui=True):
         """Switch to a different chat."""
         if chat_name:
+            self.ensure_chat_loaded(chat_name)
             self.current_chat = chat_name
             self.setWindowTitle(f"{self.current_chat}")
+            self.scheduler.set_active(chat_name)
+            self.update_stop_button()
             if update_ui:
-                self.chat_log_display.clear()
-                displayed_messages = set()
-                if chat_name in self.chat_log:
-                    for log in self.chat_log[chat_name]:
-                        message_key = f"{log['content']}{log['role']}"
-                        if (
-                            message_key not in displayed_messages
-                            and log["role"] != "system"
-                        ):
-                            self.update_ui(log["content"], log["role"])
-                            displayed_messages.add(message_key)
-            items = [
-                self.chats_list_widget.item(i).text()
-                for i in range(self.chats_list_widget.count())
-            ]
-            if chat_name in items:
-                row = items.index(chat_name)
-                self.chats_list_widget.setCurrentRow(row)
-            else:
-                self.chats_list_widget.addItem(chat_name)
-                self.chats_list_widget.setCurrentRow(self.chats_list_widget.count() - 1)
+                self.chat_log_display.set_messages(self.chat_log.get(chat_name, ()))
+                for bot_task in sorted(self.bot_tasks, key=lambda t: t.created):
+                    if bot_task.chat_name == chat_name and bot_task.task is None:
+                        self.update_ui(bot_task.user_message)  # still queued
+                if chat_name in self.stream_buffers:
+                    self.chat_log_display.append_stream(self.stream_buffers[chat_name])
+            if chat_name not in self.chat_list_model:
+                self.chat_list_model.touch(chat_name)
+            self.select_in_sidebar(chat_name)
+
+    def select_in_sidebar(self, chat_name):
+        """Highlight a chat in the sidebar without triggering another switch."""
+        index = self.chat_list_model.index_of(chat_name)
+        selection_model = self.chats_list_view.selectionModel()
+        selection_model.blockSignals(True)
+        self.chats_list_view.setCurrentIndex(index)
+        selection_model.blockSignals(False)
+        self.chats_list_view.scrollTo(index)
+
+    def request_switch(self, chat_name, delay=0):
+        """Switch chats once requests stop arriving for delay ms.
+
+        Switches requested in quick succession are coalesced, so only the last
+        chat gets rendered.
+        """
+        self.pending_chat = chat_name
+        self.switch_timer.start(delay)
+
+    def switch_to_pending_chat(self):
+        chat_name, self.pending_chat = self.pending_chat, None
+        if chat_name and chat_name != self.current_chat:
+            self.switch_chat(chat_name)
 
     def cycle_through_chats(self):
-        """Cycle through chats using Ctrl+B."""
-        current_row = self.chats_list_widget.currentRow()
-        next_row = (current_row + 1) % self.chats_list_widget.count()
-        self.chats_list_widget.setCurrentRow(next_row)
-        new_item = self.chats_list_widget.item(next_row)
-        self.switch_chat(new_item.text())
+        """Cycle through chats using Ctrl+B, rendering only where it stops."""
+        chat_name = self.chat_list_model.next_name(
+            self.pending_chat or self.current_chat
+        )
+        if chat_name is None:
+            return
+        self.select_in_sidebar(chat_name)
+        self.request_switch(chat_name, CYCLE_SWITCH_DELAY)
 
     def adjust_input_size(self):
         """Adjust the input text edit size based on content."""
@@ -410,68 +657,9 @@ class OpalApp(QMainWindow):
         if self.chat_input.height() > max_height:
             self.chat_input.setFixedHeight(max_height)
 
-    def update_ui(self, message, sender, url=""):
+    def update_ui(self, message):
         """Update the UI with a new message."""
-        cursor = self.chat_log_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        frame_format = self.create_frame_format(sender)
-        cursor.insertFrame(frame_format)
-
-        html_message = markdown.markdown(message)
-        char_format = QTextCharFormat()
-        char_format.setFontPointSize(10)
-        char_format.setFontWeight(QFont.Bold)
-        prefix = "<b>Me:</b>" if sender == "user" else "<b>Opal:</b>"
-        cursor.insertHtml(prefix + html_message)
-
-        if url:
-            self.insert_url(cursor, url)
-
-        cursor.movePosition(QTextCursor.End)
-        self.chat_log_display.setTextCursor(cursor)
-        self.chat_log_display.verticalScrollBar().setValue(
-            self.chat_log_display.verticalScrollBar().maximum()
-        )
-
-    def create_frame_format(self, sender):
-        """Create the frame format for a message."""
-        frame_format = QTextFrameFormat()
-        frame_format.setPadding(5)
-        frame_format.setBorder(1)
-        frame_format.setBorderStyle(QTextFrameFormat.BorderStyle_Solid)
-
-        if self.is_dark_mode:
-            user_bg_color = QColor.fromRgb(46, 46, 46)
-            assistant_bg_color = QColor.fromRgb(58, 58, 58)
-            user_border_color = QColor.fromRgb(68, 68, 68)
-            assistant_border_color = QColor.fromRgb(85, 85, 85)
-        else:
-            user_bg_color = QColor.fromRgb(245, 250, 255, 255)
-            assistant_bg_color = QColor.fromRgb(210, 230, 255, 255)
-            user_border_color = QColor.fromRgb(0, 0, 0, 50)
-            assistant_border_color = QColor.fromRgb(0, 0, 0, 65)
-
-        if sender == "user":
-            frame_format.setBackground(user_bg_color)
-            frame_format.setBorderBrush(user_border_color)
-        else:
-            frame_format.setBackground(assistant_bg_color)
-            frame_format.setBorderBrush(assistant_border_color)
-
-        return frame_format
-
-    def insert_url(self, cursor, url):
-        """Insert a URL into the chat log."""
-        url_format = QTextCharFormat()
-        url_format.setFontPointSize(10)
-        url_format.setFontWeight(QFont.Bold)
-        url_format.setUnderlineStyle(QTextCharFormat.SingleUnderline)
-        url_format.setAnchor(True)
-        url_format.setAnchorHref(url)
-        url_format.setForeground(QColor.fromRgb(0, 0, 255))
-        cursor.insertText(" (URL: ", url_format)
-        cursor.insertText(url, url_format)
-        cursor.insertText(")", url_format)
+        self.chat_log_display.append_message(message)
 
     def show_chat_context_menu(self, position):
         """Show the context menu for a chat."""
@@ -482,54 +670,58 @@ class OpalApp(QMainWindow):
         delete_chat_action = QAction("Delete chat", self)
         context_menu.addAction(delete_chat_action)
         delete_chat_action.triggered.connect(self.delete_current_chat)
-        context_menu.exec_(self.chats_list_widget.mapToGlobal(position))
+        context_menu.exec_(self.chats_list_view.mapToGlobal(position))
 
     def delete_current_chat(self):
-        """Delete the current chat."""
-        current_item = self.chats_list_widget.currentItem()
-        if current_item and current_item.text() != "(New Chat)":
-            self.chats_list_widget.takeItem(self.chats_list_widget.row(current_item))
-            if current_item.text() in self.chat_log:
-                del self.chat_log[current_item.text()]
+        """Delete the current chat, cancelling its queued and running requests."""
+        chat_name = self.current_chat
+        if chat_name in self.chat_list_model and chat_name != "(New Chat)":
+            for bot_task in self.bot_tasks:
+                if bot_task.chat_name == chat_name:
+                    bot_task.cancel()
+            self.stream_buffers.pop(chat_name, None)
+            self.chat_list_model.remove(chat_name)
+            if chat_name in self.chat_log:
+                del self.chat_log[chat_name]
                 self.switch_chat("(New Chat)")
-            chat_log_path = os.path.join(
-                self.CHAT_LOG_DIR, f"{current_item.text()}.json"
-            )
-            if os.path.exists(chat_log_path):
-                os.remove(chat_log_path)
+            self.chat_summaries.pop(chat_name, None)
+            self.chat_writer.call(self.delete_stored_chat, chat_name)
 
     def load_chat_history(self):
         """Load chat history from files."""
         if not os.path.exists(self.CHAT_LOG_DIR):
             return
-        for filename in os.listdir(self.CHAT_LOG_DIR):
-            chat_name = filename.rsplit(".", 1)[0]
-            self.chats_list_widget.addItem(chat_name)
-            chat_log_path = os.path.join(self.CHAT_LOG_DIR, filename)
-            try:
-                with open(chat_log_path, "r") as f:
-                    self.chat_log[chat_name] = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError, Exception):
-                pass
+        try:
+            self.chat_store.migrate_legacy()
+        except Exception as e:
+            print(f"Error migrating chat logs: {e}")
+        entries = self.chat_index.refresh()
+        recent_first = sorted(entries, key=lambda name: -entries[name]["mtime"])
+        self.chat_list_model.set_chats(["(New Chat)"] + recent_first)
+        if self.search_index is not None:
+            self.search_index.start_backfill(
+                self.chat_store, {name: e["count"] for name, e in entries.items()}
+            )
         self.switch_chat("(New Chat)")
 
-    def save_chat_history(self, chat, new_message):
-        """Save the chat history to a file."""
-        chat_log_path = os.path.join(self.CHAT_LOG_DIR, f"{chat}.json")
-        with self.mutex:
-            try:
-                if not os.path.exists(self.CHAT_LOG_DIR):
-                    os.makedirs(self.CHAT_LOG_DIR)
-                if os.path.exists(chat_log_path):
-                    with open(chat_log_path, "r") as f:
-                        existing_chat_log = json.load(f)
-                else:
-                    existing_chat_log = [OPENAI_SYSTEM_MESSAGE]
-                existing_chat_log.append(new_message)
-                with open(chat_log_path, "w") as f:
-                    json.dump(existing_chat_log, f)
-            except Exception as e:
-                print(f"Error saving chat history: {e}")
+    def ensure_chat_loaded(self, chat_name):
+        """Load a chat's messages from disk the first time it is opened."""
+        if chat_name in self.chat_log or not self.chat_store.exists(chat_name):
+            return
+        try:
+            with self.mutex:
+                self.chat_log[chat_name] = ChatHistory.from_dicts(
+                    self.chat_store.load(chat_name)
+                )
+            self.prefetch_summary(chat_name)
+        except (FileNotFoundError, json.JSONDecodeError, Exception) as e:
+            print(f"Error loading chat history: {e}")
+
+    def save_chat_history(self, chat, message):
+        """Queue a message to be appended to the chat's history file."""
+        self.chat_writer.append(
+            chat, message.to_dict(), initial_messages=[system_message().to_dict()]
+        )
 
     def showEvent(self, event):
         """Override showEvent to center the window."""
@@ -543,7 +735,7 @@ class OpalApp(QMainWindow):
     def closeEvent(self, event):
         """Override closeEvent to handle chat log cleanup."""
         if self.current_chat == "(New Chat)":
-            file_path = os.path.join(self.CHAT_LOG_DIR, f"{self.current_chat}.json")
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            self.chat_writer.call(self.chat_store.delete, self.current_chat)
+        self.chat_writer.close()
+        self.chat_log_display.shutdown()
         event.accept()
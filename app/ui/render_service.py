@@ -0,0 +1,88 @@
+import hashlib
+import html
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+RENDER_WORKERS = 2
+RENDER_CACHE_SIZE = 1024
+
+CODE_BLOCK_STYLES = {
+    "dark": "background-color: #2B2B2B; color: #E0E0E0;",
+    "light": "background-color: #F4F4F4; color: #000000;",
+}
+
+
+def render_markdown(content, theme):
+    """Convert markdown to HTML with theme-specific code block styling."""
+    import markdown  # deferred: loaded on the render workers, not at startup
+
+    html_message = markdown.markdown(content, extensions=["fenced_code"])
+    return html_message.replace(
+        "<pre>", f'<pre style="{CODE_BLOCK_STYLES[theme]}">'
+    )
+
+
+class RenderService(QObject):
+    """Render markdown to HTML on a worker pool, memoized in a bounded LRU.
+
+    ``html`` never blocks: it returns cached HTML or None after scheduling the
+    render. ``rendered`` fires on the GUI thread once new HTML is ready.
+    """
+
+    rendered = pyqtSignal(str)
+
+    def __init__(self, parent=None, workers=RENDER_WORKERS, size=RENDER_CACHE_SIZE):
+        super().__init__(parent)
+        self.size = size
+        self.cache = OrderedDict()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="markdown"
+        )
+
+    @staticmethod
+    def key(content, theme):
+        """Return the cache key for content rendered in a theme."""
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        return f"{theme}:{digest}"
+
+    def html(self, content, theme):
+        """Return rendered HTML if ready, otherwise schedule it and return None."""
+        key = self.key(content, theme)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            if key in self.pending:
+                return None
+            self.pending.add(key)
+        self.executor.submit(self.render, key, content, theme)
+        return None
+
+    def prefetch(self, contents, theme):
+        """Schedule rendering for several messages ahead of painting."""
+        for content in contents:
+            self.html(content, theme)
+
+    def render(self, key, content, theme):
+        """Worker: render one message and publish the result."""
+        try:
+            html_message = render_markdown(content, theme)
+        except Exception as e:
+            logging.error(f"Error rendering markdown: {e}")
+            html_message = f"<pre>{html.escape(content)}</pre>"
+        with self.lock:
+            self.pending.discard(key)
+            self.cache[key] = html_message
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        self.rendered.emit(key)
+
+    def shutdown(self):
+        """Stop the worker pool without waiting for queued renders."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -8,6 +8,12 @@ QTextEdit {
     border: 1px solid #CCCCCC;
     padding: 5px;
 }
+QListView#transcript {
+    background-color: #FFFFFF;
+    color: #000000;
+    border: 1px solid #CCCCCC;
+    padding: 5px;
+}
 QPushButton {
     background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #009BDF, stop:1 #007ACC);
     color: #FFFFFF;
@@ -32,7 +38,7 @@ QComboBox {
 QLabel {
     color: #333333;
 }
-QListWidget {
+QListWidget, QListView#chats {
     background-color: #FFFFFF;
     color: #000000;
     border: 1px solid #CCCCCC;
@@ -49,6 +55,12 @@ QTextEdit {
     border: 1px solid #444444;
     padding: 5px;
 }
+QListView#transcript {
+    background-color: #1E1E1E;
+    color: #E0E0E0;
+    border: 1px solid #444444;
+    padding: 5px;
+}
 QPushButton {
     background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #333333, stop:1 #222222);
     color: #CCCCCC;
@@ -73,7 +85,7 @@ QComboBox {
 QLabel {
     color: #CCCCCC;
 }
-QListWidget {
+QListWidget, QListView#chats {
     background-color: #2E2E2E;
     color: #CCCCCC;
     border: 1px solid #444444;
@@ -0,0 +1,333 @@
+import bisect
+import html
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView
+from PyQt5.QtGui import (
+    QAbstractTextDocumentLayout,
+    QColor,
+    QDesktopServices,
+    QPalette,
+    QTextDocument,
+)
+from PyQt5.QtCore import (
+    QAbstractListModel,
+    QEvent,
+    QModelIndex,
+    QSize,
+    QTimer,
+    QUrl,
+    Qt,
+)
+
+from app.llm.message import Message
+from app.ui.render_service import RenderService
+
+SenderRole = Qt.UserRole + 1
+UrlRole = Qt.UserRole + 2
+StreamingRole = Qt.UserRole + 3
+
+PAGE_SIZE = 50  # messages materialized per fetch, the viewport plus overscan
+MARGIN = 3
+PADDING = 5
+DOCUMENT_CACHE_SIZE = 256
+HEIGHT_CACHE_SIZE = 10000
+
+
+class TranscriptModel(QAbstractListModel):
+    """List model exposing the newest page of a chat, growing upwards on demand."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.positions = []
+        self.first = 0
+        self.streaming = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows) - self.first
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self.rows[self.first + index.row()]
+        if role == Qt.DisplayRole:
+            return message.content
+        if role == SenderRole:
+            return message.role
+        if role == UrlRole:
+            return message.url
+        if role == StreamingRole:
+            return self.streaming and self.first + index.row() == len(self.rows) - 1
+        return None
+
+    def set_messages(self, messages):
+        """Show a chat, materializing only its most recent page."""
+        rows = []
+        positions = []
+        for position, message in enumerate(messages):
+            if message.role != "system":
+                rows.append(message)
+                positions.append(position)
+        self.beginResetModel()
+        self.rows = rows
+        self.positions = positions
+        self.first = max(0, len(rows) - PAGE_SIZE)
+        self.streaming = False
+        self.endResetModel()
+
+    def can_fetch_older(self):
+        """Return True if older messages are not materialized yet."""
+        return self.first > 0
+
+    def fetch_older(self):
+        """Materialize the previous page of messages at the top."""
+        count = min(PAGE_SIZE, self.first)
+        if not count:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, count - 1)
+        self.first -= count
+        self.endInsertRows()
+        return count
+
+    def row_for_position(self, position):
+        """Materialize and return the row showing a chat log position, or -1."""
+        absolute = bisect.bisect_left(self.positions, position)
+        if absolute >= len(self.rows):
+            return -1
+        while absolute < self.first:
+            self.fetch_older()
+        return absolute - self.first
+
+    def append_message(self, message):
+        """Append a message at the bottom."""
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(message)
+        self.positions.append(self.positions[-1] + 1 if self.positions else 0)
+        self.endInsertRows()
+
+    def append_stream(self, delta):
+        """Extend the in-progress assistant message, creating it if needed."""
+        if not self.streaming:
+            self.append_message(Message("assistant", ""))
+            self.streaming = True
+        self.rows[-1].content += delta
+        index = self.index(self.rowCount() - 1)
+        self.dataChanged.emit(index, index)
+
+    def discard_stream(self):
+        """Remove the in-progress assistant message."""
+        if not self.streaming:
+            return
+        row = self.rowCount() - 1
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.rows.pop()
+        self.positions.pop()
+        self.streaming = False
+        self.endRemoveRows()
+
+
+class MessageDelegate(QStyledItemDelegate):
+    """Render a message as a framed rich-text block, caching layout per width."""
+
+    def __init__(self, render_service, parent=None):
+        super().__init__(parent)
+        self.render_service = render_service
+        self.is_dark_mode = True
+        self.documents = OrderedDict()
+        self.heights = OrderedDict()
+
+    def theme(self):
+        """Return the theme name used for rendering."""
+        return "dark" if self.is_dark_mode else "light"
+
+    def message_html(self, index):
+        """Build the HTML shown for a message."""
+        content = index.data(Qt.DisplayRole)
+        sender = index.data(SenderRole)
+        url = index.data(UrlRole)
+        prefix = "<b>Me:</b>" if sender == "user" else "<b>Opal:</b>"
+        body = None
+        if not index.data(StreamingRole):
+            body = self.render_service.html(content, self.theme())
+        if body is None:
+            # Plain text stands in until the render service delivers the HTML.
+            body = html.escape(content).replace("\n", "<br>")
+        if url:
+            body += f' <b>(URL: <a href="{html.escape(url)}">{html.escape(url)}</a>)</b>'
+        return prefix + body
+
+    def document(self, index, width):
+        """Return a laid out QTextDocument for a message at the given width."""
+        message_html = self.message_html(index)
+        key = (message_html, width)
+        doc = self.documents.get(key)
+        if doc is not None:
+            self.documents.move_to_end(key)
+            return doc
+        doc = QTextDocument()
+        doc.setDefaultFont(self.parent().font())
+        doc.setHtml(message_html)
+        doc.setTextWidth(width)
+        self.documents[key] = doc
+        if len(self.documents) > DOCUMENT_CACHE_SIZE:
+            self.documents.popitem(last=False)
+        return doc
+
+    def text_width(self):
+        """Return the width available to message text."""
+        return max(self.parent().viewport().width() - 2 * (MARGIN + PADDING), 50)
+
+    def sizeHint(self, option, index):
+        width = self.text_width()
+        key = (self.message_html(index), width)
+        height = self.heights.get(key)
+        if height is None:
+            height = int(self.document(index, width).size().height())
+            self.heights[key] = height
+            if len(self.heights) > HEIGHT_CACHE_SIZE:
+                self.heights.popitem(last=False)
+        return QSize(width, height + 2 * (MARGIN + PADDING))
+
+    def colors(self, sender):
+        """Return the background, border and text colors for a sender."""
+        if self.is_dark_mode:
+            if sender == "user":
+                return QColor(46, 46, 46), QColor(68, 68, 68), QColor("#E0E0E0")
+            return QColor(58, 58, 58), QColor(85, 85, 85), QColor("#E0E0E0")
+        if sender == "user":
+            return QColor(245, 250, 255), QColor(0, 0, 0, 50), QColor("#000000")
+        return QColor(210, 230, 255), QColor(0, 0, 0, 65), QColor("#000000")
+
+    def paint(self, painter, option, index):
+        background, border, text = self.colors(index.data(SenderRole))
+        rect = option.rect.adjusted(MARGIN, MARGIN, -MARGIN, -MARGIN)
+        painter.save()
+        painter.setPen(border)
+        painter.setBrush(background)
+        painter.drawRect(rect)
+        painter.translate(rect.left() + PADDING, rect.top() + PADDING)
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette.setColor(QPalette.Text, text)
+        self.document(index, self.text_width()).documentLayout().draw(
+            painter, context
+        )
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """Open links clicked inside a message."""
+        if event.type() == QEvent.MouseButtonRelease:
+            position = event.pos() - option.rect.topLeft()
+            position.setX(position.x() - MARGIN - PADDING)
+            position.setY(position.y() - MARGIN - PADDING)
+            doc = self.document(index, self.text_width())
+            anchor = doc.documentLayout().anchorAt(position)
+            if anchor:
+                QDesktopServices.openUrl(QUrl(anchor))
+                return True
+        return super().editorEvent(event, model, option, index)
+
+
+class TranscriptView(QListView):
+    """Chat transcript that only lays out the messages near the viewport."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("transcript")
+        self.transcript_model = TranscriptModel(self)
+        self.render_service = RenderService(self)
+        self.delegate = MessageDelegate(self.render_service, self)
+        self.setModel(self.transcript_model)
+        self.setItemDelegate(self.delegate)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setResizeMode(QListView.Adjust)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.populating = False
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        self.relayout_timer = QTimer(self)
+        self.relayout_timer.setSingleShot(True)
+        self.relayout_timer.timeout.connect(self.relayout)
+        self.render_service.rendered.connect(self.on_rendered)
+
+    def set_dark_mode(self, is_dark_mode):
+        """Switch message colors between light and dark mode."""
+        self.delegate.is_dark_mode = is_dark_mode
+        self.prefetch_rows(0, self.transcript_model.rowCount())
+        self.relayout()
+
+    def set_messages(self, messages):
+        """Show the given chat messages, scrolled to the newest one."""
+        self.populating = True
+        self.transcript_model.set_messages(messages)
+        self.prefetch_rows(0, self.transcript_model.rowCount())
+        self.executeDelayedItemsLayout()
+        self.scrollToBottom()
+        self.populating = False
+
+    def append_message(self, message):
+        """Append a message and scroll to it."""
+        self.transcript_model.append_message(message)
+        self.scrollToBottom()
+
+    def append_stream(self, delta):
+        """Extend the in-progress assistant message and keep it in view."""
+        self.transcript_model.append_stream(delta)
+        self.scrollToBottom()
+
+    def discard_stream(self):
+        """Remove the in-progress assistant message."""
+        self.transcript_model.discard_stream()
+
+    def scroll_to_message(self, position):
+        """Scroll to the message stored at a chat log position."""
+        self.populating = True
+        row = self.transcript_model.row_for_position(position)
+        self.prefetch_rows(0, self.transcript_model.rowCount())
+        self.executeDelayedItemsLayout()
+        if row >= 0:
+            self.scrollTo(
+                self.transcript_model.index(row), QAbstractItemView.PositionAtTop
+            )
+        self.populating = False
+
+    def on_scroll(self, value):
+        """Fetch older messages when scrolled to the top, keeping the position."""
+        scroll_bar = self.verticalScrollBar()
+        if (
+            self.populating
+            or value != scroll_bar.minimum()
+            or not self.transcript_model.can_fetch_older()
+        ):
+            return
+        old_maximum = scroll_bar.maximum()
+        self.prefetch_rows(0, self.transcript_model.fetch_older())
+        self.executeDelayedItemsLayout()
+        scroll_bar.setValue(scroll_bar.maximum() - old_maximum)
+
+    def prefetch_rows(self, start, count):
+        """Queue markdown rendering for newly materialized rows."""
+        model = self.transcript_model
+        self.render_service.prefetch(
+            (model.index(row).data() for row in range(start, start + count)),
+            self.delegate.theme(),
+        )
+
+    def on_rendered(self, key):
+        """Coalesce relayouts as rendered HTML arrives from the workers."""
+        if not self.relayout_timer.isActive():
+            self.relayout_timer.start(0)
+
+    def relayout(self):
+        """Lay out again with freshly rendered messages, keeping the bottom in view."""
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        self.scheduleDelayedItemsLayout()
+        self.executeDelayedItemsLayout()
+        if at_bottom:
+            self.scrollToBottom()
+        self.viewport().update()
+
+    def shutdown(self):
+        """Release the render workers."""
+        self.render_service.shutdown()
@@ -0,0 +1,289 @@
+"""Micro-benchmarks for storage, rendering and prompt assembly hot paths.
+
+Run ``python -m benchmarks.run`` from the repository root. Results are written
+as JSON and can be compared against a stored baseline; GUI paths use Qt's
+offscreen platform and are skipped when PyQt5 is unavailable.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_chat_log, make_reply
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+QUICK_SIZES = (10, 100, 1000)
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """Raised by a benchmark whose dependencies are unavailable."""
+
+
+def benchmark(name, max_size=None):
+    """Register a benchmark taking (size, workdir) and returning a callable.
+
+    The setup may instead return (callable, teardown); teardown runs once
+    after the timings are taken.
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = (setup, max_size)
+        return setup
+
+    return register
+
+
+def measure(run, repeat):
+    """Return the timings of repeat calls of run."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+@benchmark("store.append")
+def bench_store_append(size, workdir):
+    """Append one message to a chat that already holds size messages."""
+    from app.core.chat_store import ChatStore
+
+    store = ChatStore(workdir)
+    store.create("chat", make_chat_log(size))
+    message = {"role": "user", "content": "one more question", "url": ""}
+    return lambda: store.append("chat", message)
+
+
+@benchmark("store.load")
+def bench_store_load(size, workdir):
+    """Load a chat of size messages."""
+    from app.core.chat_store import ChatStore
+
+    store = ChatStore(workdir)
+    store.create("chat", make_chat_log(size))
+    return lambda: store.load("chat")
+
+
+@benchmark("index.refresh", max_size=10000)
+def bench_index_refresh(size, workdir):
+    """Refresh the chat index over size chats with one changed file."""
+    from app.core.chat_index import ChatIndex
+    from app.core.chat_store import ChatStore
+
+    store = ChatStore(workdir)
+    chat_log = make_chat_log(20)
+    for i in range(size):
+        store.create(f"chat {i}", chat_log)
+    index = ChatIndex(store)
+    index.refresh()
+
+    def run():
+        store.append("chat 0", {"role": "user", "content": "changed"})
+        index.refresh()
+
+    return run
+
+
+@benchmark("markdown.render", max_size=1000)
+def bench_markdown(size, workdir):
+    """Render size code-heavy replies to HTML, uncached."""
+    try:
+        from app.ui.render_service import render_markdown
+    except ImportError as e:
+        raise Skip(str(e))
+    import random
+
+    rng = random.Random(size)
+    replies = [make_reply(rng, code_blocks=3) for _ in range(size)]
+    return lambda: [render_markdown(reply, "dark") for reply in replies]
+
+
+@benchmark("prompt.build_context")
+def bench_build_context(size, workdir):
+    """Assemble the budgeted prompt for a chat of size messages."""
+    try:
+        from app.llm.context_manager import build_context
+        from app.llm.message import ChatHistory
+    except ImportError as e:
+        raise Skip(str(e))
+    chat_log = ChatHistory.from_dicts(make_chat_log(size))
+    return lambda: build_context(chat_log, "gpt-4o")
+
+
+def qt_app():
+    """Return a QApplication on the offscreen platform."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError as e:
+        raise Skip(str(e))
+    return QApplication.instance() or QApplication([])
+
+
+def close_window(window):
+    """Close a main window and wait for its background threads."""
+    window.close()  # joins the writer thread
+    if window.search_index is not None:
+        window.search_index.ready.wait(60)
+    window.deleteLater()
+
+
+@benchmark("gui.switch_chat", max_size=100000)
+def bench_switch_chat(size, workdir):
+    """Switch the main window to a chat of size messages and paint it."""
+    app = qt_app()
+    from app.core.chat_store import ChatStore
+
+    ChatStore(os.path.join(workdir, "app", ".chat_logs")).create(
+        "big", make_chat_log(size)
+    )
+    os.chdir(workdir)
+    try:
+        from app.ui.main_window import OpalApp
+    except ImportError as e:
+        raise Skip(str(e))
+    window = OpalApp()
+    window.show()
+    model = window.chat_log_display.transcript_model
+
+    def run():
+        window.switch_chat("(New Chat)")
+        model.beginResetModel()
+        model.rows.clear()
+        model.endResetModel()
+        window.switch_chat("big")
+        window.chat_log_display.viewport().repaint()
+        app.processEvents()
+
+    return run, lambda: close_window(window)
+
+
+@benchmark("gui.load_chat_history", max_size=10000)
+def bench_load_chat_history(size, workdir):
+    """Build the main window, load its history of size chats and close it."""
+    app = qt_app()
+    from app.core.chat_store import ChatStore
+
+    store = ChatStore(os.path.join(workdir, "app", ".chat_logs"))
+    chat_log = make_chat_log(20)
+    for i in range(size):
+        store.create(f"chat {i}", chat_log)
+    os.chdir(workdir)
+    try:
+        from app.ui.main_window import OpalApp
+    except ImportError as e:
+        raise Skip(str(e))
+
+    def run():
+        window = OpalApp()
+        window.load_chat_history()
+        app.processEvents()
+        close_window(window)
+        app.processEvents()
+
+    return run
+
+
+def run_benchmarks(names, sizes, repeat):
+    """Run the selected benchmarks and return result records."""
+    results = []
+    cwd = os.getcwd()
+    for name in names:
+        setup, max_size = BENCHMARKS[name]
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            workdir = tempfile.mkdtemp(prefix="opal-bench-")
+            record = {"name": name, "size": size}
+            teardown = None
+            try:
+                run = setup(size, workdir)
+                if isinstance(run, tuple):
+                    run, teardown = run
+                run()  # warm-up
+                timings = measure(run, repeat)
+                record.update(
+                    median_s=statistics.median(timings),
+                    min_s=min(timings),
+                    runs=len(timings),
+                )
+            except Skip as e:
+                record["skipped"] = str(e)
+            finally:
+                if teardown is not None:
+                    teardown()
+                os.chdir(cwd)
+                shutil.rmtree(workdir, ignore_errors=True)
+            results.append(record)
+            print(format_record(record), file=sys.stderr)
+    return results
+
+
+def format_record(record):
+    label = f"{record['name']:<24} n={record['size']:<7}"
+    if "skipped" in record:
+        return f"{label} skipped: {record['skipped']}"
+    return f"{label} median {record['median_s'] * 1000:10.3f} ms"
+
+
+def compare(results, baseline, threshold):
+    """Return the results that got slower than the baseline by threshold."""
+    previous = {
+        (r["name"], r["size"]): r for r in baseline["results"] if "median_s" in r
+    }
+    regressions = []
+    for record in results:
+        old = previous.get((record["name"], record["size"]))
+        if old and "median_s" in record:
+            ratio = record["median_s"] / old["median_s"]
+            record["baseline_ratio"] = round(ratio, 3)
+            if ratio > threshold:
+                regressions.append(record)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-b", "--benchmark", action="append", choices=BENCHMARKS)
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--quick", action="store_true", help="only small sizes")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    results = run_benchmarks(args.benchmark or list(BENCHMARKS), sizes, args.repeat)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for record in regressions:
+        print(
+            f"REGRESSION {record['name']} n={record['size']}: "
+            f"{record['baseline_ratio']}x baseline",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
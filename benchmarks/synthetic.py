@@ -0,0 +1,47 @@
+"""Deterministic synthetic chat logs for the benchmarks."""
+
+import random
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog linux kernel process thread "
+    "socket memory cache latency budget window token prompt model answer"
+).split()
+
+CODE_BLOCK = '''```python
+def handler(event, context):
+    records = [r for r in event["Records"] if r.get("body")]
+    for record in records:
+        process(record["body"], retries=3)
+    return {"statusCode": 200, "count": len(records)}
+```'''
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_reply(rng, paragraphs=3, code_blocks=1):
+    """Return an assistant-style markdown reply."""
+    parts = ["EXPERT: Systems Engineer", "OBJECTIVE: " + sentence(rng, 8)]
+    for _ in range(paragraphs):
+        parts.append(" ".join(sentence(rng) for _ in range(4)))
+        parts.append(
+            "\n".join(
+                f"- **{rng.choice(WORDS)}**: {sentence(rng, 6)}" for _ in range(3)
+            )
+        )
+    parts += [CODE_BLOCK] * code_blocks
+    return "\n\n".join(parts)
+
+
+def make_chat_log(messages, seed=0, code_blocks=1):
+    """Return a chat log with a system message and alternating turns."""
+    rng = random.Random(seed)
+    chat_log = [{"role": "system", "content": "You are Opal. " * 200}]
+    for i in range(messages):
+        if i % 2 == 0:
+            chat_log.append({"role": "user", "content": sentence(rng, 15)})
+        else:
+            reply = make_reply(rng, code_blocks=code_blocks)
+            chat_log.append({"role": "assistant", "content": reply})
+    return chat_log
@@ -0,0 +1,15 @@
+import asyncio
+
+from app.core.bot_task import BotTask
+from app.llm.message import ChatHistory, Message
+
+
+def test_cancelled_request_in_new_chat_keeps_the_system_prompt():
+    chat_log, user_message = ChatHistory(), Message("user", "hello")
+    task = BotTask("chat", user_message, chat_log, "gpt-4o")
+    published = []
+    task.new_message.connect(lambda chat, message: published.append(message))
+    task.cancel()
+    asyncio.run(task.run())
+    assert [m.role for m in chat_log] == ["system", "user"]
+    assert chat_log[1] is user_message and published == [user_message]
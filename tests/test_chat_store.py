@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.core.chat_store import ChatStore
+
+SYSTEM = {"role": "system", "content": "You are Opal."}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChatStore(str(tmp_path))
+
+
+def user(content):
+    return {"role": "user", "content": content}
+
+
+def test_append_and_load_round_trip(store):
+    written = store.append_many("chat", [user("hi"), user("there")], [SYSTEM])
+    assert written == [SYSTEM, user("hi"), user("there")]
+    store.append("chat", user("again"))
+    assert store.load("chat") == [SYSTEM, user("hi"), user("there"), user("again")]
+
+
+def test_large_messages_are_stored_as_blobs(store):
+    big = "x" * ChatStore.BLOB_MIN_SIZE
+    store.append_many("chat", [user(big)], [SYSTEM])
+    with open(store.path("chat"), encoding="utf-8") as f:
+        assert big not in f.read()
+    assert store.load("chat")[1]["content"] == big
+
+
+def test_torn_tail_is_truncated(store):
+    store.append_many("chat", [user("kept")], [SYSTEM])
+    size = os.path.getsize(store.path("chat"))
+    with open(store.path("chat"), "a", encoding="utf-8") as f:
+        f.write('{"role": "user", "con')
+    assert store.load("chat") == [SYSTEM, user("kept")]
+    assert os.path.getsize(store.path("chat")) == size
+
+
+def test_append_in_progress_is_not_truncated(store):
+    store.append_many("chat", [user("first")], [SYSTEM])
+    line = '{"role": "user", "content": "second"}\n'
+    half_written = threading.Event()
+
+    def slow_append():
+        with store.lock:
+            with open(store.path("chat"), "a", encoding="utf-8") as f:
+                f.write(line[:10])
+                f.flush()
+                half_written.set()
+                time.sleep(0.2)
+                f.write(line[10:])
+
+    writer = threading.Thread(target=slow_append)
+    writer.start()
+    half_written.wait()
+    assert store.load("chat") == [SYSTEM, user("first"), user("second")]
+    writer.join()
+    assert store.load("chat")[-1] == user("second")
+
+
+def test_archived_chat_round_trip(store):
+    store.append_many("old", [user("archived")], [SYSTEM])
+    store.append_many("new", [user("live")], [SYSTEM])
+    os.utime(store.path("old"), (0, 0))
+    assert store.compact(archive_after=60) == 1
+    assert not os.path.exists(store.path("old"))
+    assert store.exists("old") and "old" in store.list_chats()
+    assert store.load("old") == [SYSTEM, user("archived")]
+
+    store.append("old", user("restored"))
+    assert os.path.exists(store.path("old"))
+    assert store.load("old") == [SYSTEM, user("archived"), user("restored")]
+    assert store.load("new") == [SYSTEM, user("live")]
+
+
+def test_rename_and_delete_move_the_summary(store):
+    store.append_many("a", [user("hi")], [SYSTEM])
+    store.save_summary("a", {"content": "greeting", "covered": 2})
+    store.rename("a", "b")
+    assert store.load_summary("b") == {"content": "greeting", "covered": 2}
+    assert store.load_summary("a") is None
+    store.delete("b")
+    assert not store.exists("b") and store.load_summary("b") is None
+
+
+def test_blobs_are_collected_with_their_last_chat(store, monkeypatch):
+    big = "x" * ChatStore.BLOB_MIN_SIZE
+    store.append_many("old", [user(big)], [SYSTEM])
+    store.append_many("new", [user("hi")], [SYSTEM])
+    os.utime(store.path("old"), (0, 0))
+    store.compact(archive_after=60)
+
+    # Blob references come from the record, not from reading chat files.
+    monkeypatch.setattr(ChatStore, "scan_blob_refs", lambda self: pytest.fail())
+    store = ChatStore(store.directory)
+    store.delete("new")
+    assert len(os.listdir(store.blob_directory)) == 2
+    store.append("old", user("restored"))
+    store.delete("old")
+    assert os.listdir(store.blob_directory) == []
+
+
+def test_missing_blob_record_is_rebuilt(store):
+    big = "x" * ChatStore.BLOB_MIN_SIZE
+    store.append_many("a", [user(big)], [SYSTEM])
+    store.append_many("b", [user("hi")], [SYSTEM])
+    os.remove(store.refs_path)
+    store = ChatStore(store.directory)
+    store.delete("b")
+    assert store.load("a") == [SYSTEM, user(big)]
+
+
+def test_archiving_replaces_the_segment(store):
+    for chat in ("a", "b"):
+        store.append_many(chat, [user(chat)], [SYSTEM])
+        os.utime(store.path(chat), (0, 0))
+        store.compact(archive_after=60)
+    assert sorted(os.listdir(store.archive.directory)) == [
+        "manifest.json",
+        "segment-000001.zip",
+    ]
+    assert store.load("a") == [SYSTEM, user("a")]
+    assert store.load("b") == [SYSTEM, user("b")]
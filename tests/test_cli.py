@@ -0,0 +1,70 @@
+import io
+import json
+import threading
+
+import pytest
+
+from app.core import cli
+
+
+def fake_process_message(prompt, chat_log, model):
+    if prompt == "fail":
+        return "Sorry, something went wrong.", None, chat_log, None, None
+    return f"answer to {prompt}", None, chat_log, model, None
+
+
+@pytest.fixture(autouse=True)
+def process(monkeypatch):
+    monkeypatch.setattr(cli, "process_message", fake_process_message)
+
+
+def run(lines, tmp_path, **kwargs):
+    path = tmp_path / "in.jsonl"
+    path.write_text("\n".join(lines) + "\n")
+    output = io.StringIO()
+    cli.run_batch(cli.read_prompts([str(path)]), output, 2, "gpt-4o", **kwargs)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    return {record["id"]: record for record in records}
+
+
+def test_cached_answer_without_response_is_ok(tmp_path):
+    records = run(['{"id": "a", "prompt": "hi"}'], tmp_path)
+    assert records["a"]["ok"] and records["a"]["response"] == "answer to hi"
+
+
+def test_failed_request_is_not_ok(tmp_path):
+    records = run(['{"id": "a", "prompt": "fail"}'], tmp_path)
+    assert not records["a"]["ok"] and records["a"]["error"]
+
+
+def test_malformed_lines_are_reported_and_skipped(tmp_path):
+    records = run(['{"id": "a", "prompt": "hi"', "42", '"next"'], tmp_path)
+    path = str(tmp_path / "in.jsonl")
+    assert "Invalid JSON" in records[f"{path}:1"]["error"]
+    assert not records[f"{path}:2"]["ok"]
+    assert records[f"{path}:3"]["ok"]
+
+
+def test_interrupt_writes_finished_answers(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(prompt, chat_log, model):
+        if prompt == "slow":
+            started.set()
+            release.wait(5)
+        return fake_process_message(prompt, chat_log, model)
+
+    monkeypatch.setattr(cli, "process_message", slow)
+
+    def prompts():
+        yield "a", {"prompt": "fast"}
+        yield "b", {"prompt": "slow"}
+        started.wait(5)
+        release.set()
+        raise KeyboardInterrupt
+
+    output = io.StringIO()
+    with pytest.raises(KeyboardInterrupt):
+        cli.run_batch(prompts(), output, 2, "gpt-4o")
+    ids = {json.loads(line)["id"] for line in output.getvalue().splitlines()}
+    assert ids == {"a", "b"}
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.llm import context_manager, process_message
+from app.llm.config import FAST_MODEL
+from app.llm.context_manager import (
+    build_context,
+    context_budget,
+    count_tokens,
+    summary_request,
+    update_summary_async,
+)
+from app.llm.message import Message
+
+
+class FakeEngine:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    async def ask_llm(self, messages, model):
+        self.requests.append(messages)
+        return self.replies.pop(0)
+
+
+def long_chat(turns, chars=2000):
+    log = [Message("system", "s")]
+    log += [Message("user" if i % 2 else "assistant", "x" * chars) for i in range(turns)]
+    return log
+
+
+def summarize(monkeypatch, chat_log, pending, replies, summary=None):
+    engine = FakeEngine(replies)
+    monkeypatch.setattr(process_message, "engine", engine)
+    updates = []
+    context_manager.claim_summary("key")
+    asyncio.run(update_summary_async("key", chat_log, summary, pending, updates.append))
+    return engine, updates
+
+
+def test_build_context_reports_dropped_turns():
+    log = long_chat(370)
+    messages, pending = build_context(log, FAST_MODEL)
+    assert pending[0] == 1 and pending[1] == len(log) - len(messages) + 2
+    assert sum(count_tokens(Message(**m)) for m in messages) <= context_budget(FAST_MODEL)
+
+
+def test_summary_is_built_in_batches_that_fit(monkeypatch):
+    log = long_chat(370)
+    replies = [(f"summary {i}", None, FAST_MODEL, None) for i in range(100)]
+    engine, updates = summarize(monkeypatch, log, (1, 300), replies)
+
+    assert len(engine.requests) > 1
+    for request in engine.requests:
+        text = "".join(m["content"] for m in request)
+        assert len(text) // 4 <= context_budget(FAST_MODEL)
+    covered = [update["covered"] for update in updates]
+    assert covered == sorted(covered) and covered[-1] == 300
+    assert engine.requests[1][1]["content"].startswith("Existing summary:\nsummary 0")
+
+
+def test_cached_answer_without_response_is_used(monkeypatch):
+    log = long_chat(4)
+    _, updates = summarize(monkeypatch, log, (1, 3), [("cached", None, FAST_MODEL, None)])
+    assert updates == [{"content": "cached", "covered": 3}]
+
+
+def test_failure_keeps_earlier_batches(monkeypatch):
+    log = long_chat(370)
+    replies = [("first", None, FAST_MODEL, None), ("error", None, None, None)]
+    engine, updates = summarize(monkeypatch, log, (1, 300), replies)
+    assert len(engine.requests) == 2
+    assert len(updates) == 1 and 1 < updates[0]["covered"] < 300
+    assert context_manager.claim_summary("key")
+    context_manager.release_summary("key")
+
+
+@pytest.mark.parametrize("chars", [10, 10**6])
+def test_oversized_turn_is_clipped(chars):
+    request = summary_request(None, [Message("user", "y" * chars)])
+    assert len(request[1]["content"]) <= context_budget(FAST_MODEL) * 4
+
+
+def test_recall_runs_off_the_event_loop_thread(monkeypatch):
+    engine = FakeEngine([("hi", None, "gpt-4o", None)])
+    monkeypatch.setattr(process_message, "engine", engine)
+    threads = []
+
+    def recall(text, limit):
+        threads.append(threading.get_ident())
+        return [("old", 1, "user", "earlier question")]
+
+    log = []
+    reply = process_message.process_message_async("hello", log, "gpt-4o", recall=recall)
+    asyncio.run(reply)
+    assert threads and threads[0] != threading.get_ident()
+    assert [m.role for m in log] == ["system", "user", "assistant"]
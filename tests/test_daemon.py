@@ -0,0 +1,49 @@
+import os
+import socket
+
+import pytest
+
+from app.core.daemon import acquire_lock, secure_directory
+from app.llm.config import ERROR_MESSAGE
+from app.llm.daemon_client import answer_of, check_peer, peer_uid
+from app.llm.telemetry import RequestTimer
+
+
+def test_socket_directory_is_created_private(tmp_path):
+    path = tmp_path / "run" / "opal.sock"
+    secure_directory(str(path))
+    assert os.stat(path.parent).st_mode & 0o777 == 0o700
+
+
+def test_shared_directory_is_refused(tmp_path):
+    tmp_path.chmod(0o777)
+    with pytest.raises(PermissionError):
+        secure_directory(str(tmp_path / "opal.sock"))
+
+
+def test_only_one_daemon_holds_the_lock(tmp_path):
+    path = str(tmp_path / "opal.sock")
+    first = acquire_lock(path)
+    assert first is not None
+    assert acquire_lock(path) is None
+    first.close()
+    second = acquire_lock(path)
+    assert second is not None
+    second.close()
+
+
+def test_peer_runs_as_current_user():
+    a, b = socket.socketpair(socket.AF_UNIX)
+    with a, b:
+        assert peer_uid(a) == os.getuid()
+        check_peer(a)
+
+
+def test_error_reply_becomes_the_error_message():
+    reply = {"error": "Unknown op: ask"}
+    assert answer_of(reply, RequestTimer("gpt-4o")) == (ERROR_MESSAGE, None, None, None)
+
+
+def test_answer_reply_is_unpacked():
+    reply = {"answer": "hi", "url": None, "model": "gpt-4o", "response": None}
+    assert answer_of(reply, RequestTimer("gpt-4o")) == ("hi", None, "gpt-4o", None)
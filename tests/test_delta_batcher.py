@@ -0,0 +1,20 @@
+import asyncio
+
+from app.core.delta_batcher import DeltaBatcher
+
+
+def test_held_back_deltas_are_flushed_when_the_window_expires():
+    emitted = []
+
+    async def main():
+        batcher = DeltaBatcher(emitted.append, interval=0.05)
+        batcher.add("a")
+        batcher.add("b")
+        batcher.add("c")
+        assert emitted == ["a"]
+        await asyncio.sleep(0.1)
+        assert emitted == ["a", "bc"]
+        batcher.flush()
+
+    asyncio.run(main())
+    assert emitted == ["a", "bc"]
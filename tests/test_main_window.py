@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+from app.core.bot_task import BotTask
+from app.llm.message import ChatHistory, Message
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    from app.ui.main_window import OpalApp
+
+    monkeypatch.chdir(tmp_path)
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    window = OpalApp()
+    yield window
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+
+
+def test_deleted_chat_cancels_its_requests_and_stays_deleted(window):
+    window.chat_log["doomed"] = ChatHistory()
+    window.switch_chat("doomed")
+    window.record_message("doomed", Message("user", "first"))
+    window.chat_writer.flush()
+    assert window.chat_store.exists("doomed")
+
+    task = BotTask("doomed", Message("user", "second"), window.chat_log["doomed"], "")
+    task.new_message.connect(window.record_message)
+    window.bot_tasks.add(task)
+    window.delete_current_chat()
+    assert task.cancelled and window.current_chat == "(New Chat)"
+
+    asyncio.run(task.run())  # a cancelled request still publishes its user turn
+    window.chat_writer.flush()
+    assert "doomed" not in window.chat_list_model
+    assert not window.chat_store.exists("doomed")
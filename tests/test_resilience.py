@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.llm import resilience
+from app.llm.config import INTERRUPTED_MESSAGE
+from app.llm.resilience import CircuitBreaker, LatencyTracker, hedged_call
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.is_open()
+    breaker.record_failure()
+    assert breaker.is_open() and not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_after_cool_down(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+    assert not breaker.allow()  # the probe is still out
+    breaker.record_success()
+    assert not breaker.is_open() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock[0] += 31
+    assert breaker.allow()
+
+
+def test_lost_probe_expires(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+    clock[0] += 31
+    assert breaker.allow()
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = LatencyTracker()
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        tracker.record("slow", 0.05)
+    monkeypatch.setattr(resilience, "latency_tracker", tracker)
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", True)
+    return tracker
+
+
+def numbered(behaviours):
+    """Return a call whose n-th invocation runs behaviours[n]."""
+    calls = []
+    lock = threading.Lock()
+
+    def call(model):
+        with lock:
+            n = len(calls)
+            calls.append(model)
+        return behaviours[n]()
+
+    return call, calls
+
+
+def test_fast_primary_sends_no_hedge(tracker):
+    call, calls = numbered([lambda: "primary"])
+    assert hedged_call(call, "slow") == "primary"
+    time.sleep(0.1)
+    assert len(calls) == 1
+
+
+def test_hedge_beats_slow_primary(tracker):
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "primary"
+
+    call, calls = numbered([slow, lambda: "hedged"])
+    started = time.monotonic()
+    try:
+        assert hedged_call(call, "slow") == "hedged"
+        assert time.monotonic() - started < 1
+        assert len(calls) == 2
+    finally:
+        release.set()
+
+
+def test_hedge_answers_when_slow_primary_fails(tracker):
+    def slow_failure():
+        time.sleep(0.2)
+        raise ConnectionError("primary failed")
+
+    def slower_success():
+        time.sleep(0.3)
+        return "hedged"
+
+    call, calls = numbered([slow_failure, slower_success])
+    assert hedged_call(call, "slow") == "hedged"
+    assert len(calls) == 2
+
+
+def test_primary_error_is_raised_without_a_hedge(tracker):
+    def call(model):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        hedged_call(call, "slow")
+
+
+def test_broken_async_stream_is_flagged_and_counted(monkeypatch):
+    from app.llm import async_engine
+
+    breaker = CircuitBreaker(failure_threshold=1)
+    monkeypatch.setattr(async_engine, "circuit_breaker", breaker)
+    monkeypatch.setattr(async_engine, "get_response_cache", lambda: None)
+    engine = async_engine.LLMEngine()
+
+    async def stream_text(chat_log, model):
+        yield "partial"
+        raise httpx.ReadError("connection reset")
+
+    monkeypatch.setattr(engine, "stream_text", stream_text)
+
+    async def collect():
+        return [delta async for delta in engine.ask_llm_stream([], "gpt-4o")]
+
+    assert asyncio.run(collect()) == ["partial", INTERRUPTED_MESSAGE]
+    assert breaker.is_open()
+
+
+def test_closing_an_async_stream_early_is_not_a_failure(monkeypatch):
+    from app.llm import async_engine
+
+    finished = []
+    monkeypatch.setattr(async_engine, "get_response_cache", lambda: None)
+    monkeypatch.setattr(
+        async_engine.RequestTimer,
+        "finish",
+        lambda timer, failed=False: finished.append(failed),
+    )
+    engine = async_engine.LLMEngine()
+
+    async def stream_text(chat_log, model):
+        yield "first"
+        yield "second"
+
+    monkeypatch.setattr(engine, "stream_text", stream_text)
+
+    async def read_one():
+        stream = engine.ask_llm_stream([], "gpt-4o")
+        assert await stream.__anext__() == "first"
+        await stream.aclose()
+
+    asyncio.run(read_one())
+    assert finished == [False]
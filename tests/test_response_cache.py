@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.llm import response_cache
+from app.llm.response_cache import ResponseCache, cache_key
+from app.llm.telemetry import Telemetry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_key_ignores_extra_message_fields():
+    plain = [{"role": "user", "content": "hi"}]
+    extra = [{"role": "user", "content": "hi", "url": "x"}]
+    assert cache_key("gpt-4o", plain) == cache_key("gpt-4o", extra)
+    assert cache_key("gpt-4o", plain) != cache_key("gpt-4", plain)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("k", "answer")
+    clock[0] += 59
+    assert cache.get("k") == "answer"
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 0, "evictions": 1}
+    assert cache.total_bytes == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=3600, max_bytes=10)
+    cache.put("a", "aaaa")
+    clock[0] += 1
+    cache.put("b", "bbbb")
+    clock[0] += 1
+    assert cache.get("a") == "aaaa"  # a is now more recent than b
+    clock[0] += 1
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa" and cache.get("c") == "cccc"
+    assert cache.total_bytes == 8
+
+
+def test_counters_are_exported_to_telemetry(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(response_cache, "telemetry", Telemetry())
+    cache = make_cache(tmp_path, ttl=3600, max_bytes=4)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") is None and cache.get("b") == "bbbb"
+    metrics = response_cache.telemetry.render_prometheus()
+    for event, value in (("hits", 1), ("misses", 1), ("evictions", 1)):
+        assert f'opal_response_cache_total{{event="{event}"}} {value}' in metrics
+
+
+def test_size_survives_reopening(tmp_path):
+    make_cache(tmp_path).put("k", "answer")
+    assert make_cache(tmp_path).total_bytes == len("answer")
+
+
+def test_concurrent_callers_share_one_computation(tmp_path):
+    cache = make_cache(tmp_path)
+    calls, started = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "answer"
+
+    leader = threading.Thread(target=cache.get_or_compute, args=("k", compute))
+    leader.start()
+    started.wait()
+    results = []
+
+    def follow():
+        results.append(cache.get_or_compute("k", compute))
+
+    followers = [threading.Thread(target=follow) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+    assert calls == [1] and results == ["answer"] * 3
+
+
+def test_uncacheable_answer_is_not_stored(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get_or_compute("k", lambda: None) is None
+    assert cache.get("k") is None
+
+
+def test_async_followers_get_the_leaders_answer(tmp_path):
+    cache = make_cache(tmp_path)
+
+    async def main():
+        answer, flight = await cache.join_flight("k")
+        assert answer is None and flight is not None
+        follower = asyncio.ensure_future(cache.join_flight("k"))
+        await asyncio.sleep(0)
+        cache.finish_flight("k", flight, "answer")
+        return await follower
+
+    assert asyncio.run(main()) == ("answer", None)
+    assert cache.get("k") == "answer"
@@ -0,0 +1,57 @@
+import pytest
+
+from app.llm import router
+from app.llm.config import DEFAULT_MODEL, SLOW_MODEL
+from app.llm.context_manager import context_tokens
+from app.llm.message import Message
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    stats = router.BackendStats()
+    monkeypatch.setattr(router, "backend_stats", stats)
+    return stats
+
+
+def test_markers_win_over_prompt_size():
+    assert router.classify("(what is dns)", 3500) == "quick"
+    assert router.classify("V=1 T=0 dns", 9000) == "quick"
+    assert router.classify("V=5 explain dns", 10) == "heavy"
+
+
+def test_prompt_size_decides_unmarked_messages():
+    assert router.classify("explain dns", 100) == "normal"
+    assert router.classify("explain dns", 3500) == "heavy"
+
+
+def test_quick_question_in_long_chat_skips_slow_model(stats):
+    stats.record("gpt-3.5-turbo", 0.2)
+    stats.record(DEFAULT_MODEL, 0.5)
+    assert router.route("(what is dns)", 3500) == "gpt-3.5-turbo"
+
+
+def test_heavy_goes_to_slow_model_when_it_fits():
+    assert router.route("V=5 explain dns", 500) == SLOW_MODEL
+
+
+def test_heavy_falls_back_to_default_when_slow_model_cannot_fit(stats):
+    stats.record("gpt-3.5-turbo", 0.1)
+    assert router.route("V=5 explain dns", 9000) == DEFAULT_MODEL
+
+
+def test_unhealthy_backend_is_skipped(stats):
+    for _ in range(3):
+        stats.record(SLOW_MODEL, 1.0, failed=True)
+    assert not stats.healthy(SLOW_MODEL)
+    assert router.route("V=5 explain dns", 500) == DEFAULT_MODEL
+
+
+def test_resolve_keeps_explicit_models():
+    assert router.resolve(SLOW_MODEL, "(hi)", 0) == SLOW_MODEL
+
+
+def test_context_tokens_skips_summarized_turns():
+    log = [Message("system", "s")] + [Message("user", "x" * 400) for _ in range(10)]
+    full = context_tokens(log)
+    summary = {"content": "short", "covered": 9}
+    assert context_tokens(log, summary) < full / 4
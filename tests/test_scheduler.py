@@ -0,0 +1,93 @@
+import asyncio
+
+from app.core.scheduler import ChatScheduler
+
+
+def job(log, name, gate=None):
+    async def run():
+        log.append(("start", name))
+        if gate is not None:
+            await gate.wait()
+        else:
+            await asyncio.sleep(0)
+        log.append(("end", name))
+
+    return run
+
+
+async def drain(scheduler):
+    while scheduler.is_busy():
+        await asyncio.sleep(0.001)
+
+
+def test_requests_of_a_chat_run_in_order_one_at_a_time():
+    async def main():
+        scheduler, log = ChatScheduler(max_workers=4), []
+        for i in range(3):
+            scheduler.submit("a", job(log, i))
+        await drain(scheduler)
+        return log
+
+    log = asyncio.run(main())
+    assert log == [(kind, i) for i in range(3) for kind in ("start", "end")]
+
+
+def test_global_cap_limits_running_chats():
+    async def main():
+        scheduler, log, gate = ChatScheduler(max_workers=2), [], asyncio.Event()
+        for chat in "abc":
+            scheduler.submit(chat, job(log, chat, gate))
+        await asyncio.sleep(0.01)
+        running = len(scheduler.running), scheduler.pending()
+        gate.set()
+        await drain(scheduler)
+        return running, log
+
+    (running, pending), log = asyncio.run(main())
+    assert (running, pending) == (2, 1)
+    assert [name for kind, name in log if kind == "start"] == ["a", "b", "c"]
+
+
+def test_active_chat_goes_first():
+    async def main():
+        scheduler, log, gate = ChatScheduler(max_workers=1), [], asyncio.Event()
+        scheduler.submit("busy", job(log, "busy", gate))
+        scheduler.submit("background", job(log, "background"))
+        scheduler.submit("active", job(log, "active"))
+        scheduler.set_active("active")
+        gate.set()
+        await drain(scheduler)
+        return [name for kind, name in log if kind == "start"]
+
+    assert asyncio.run(main()) == ["busy", "active", "background"]
+
+
+def test_failed_request_does_not_block_the_queue():
+    async def main():
+        scheduler, log = ChatScheduler(max_workers=1), []
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        scheduler.submit("a", fail)
+        scheduler.submit("a", job(log, "next"))
+        await drain(scheduler)
+        return log
+
+    assert asyncio.run(main()) == [("start", "next"), ("end", "next")]
+
+
+def test_rename_moves_queued_requests():
+    async def main():
+        scheduler, log, gate = ChatScheduler(max_workers=1), [], asyncio.Event()
+        scheduler.submit("old", job(log, 1, gate))
+        scheduler.submit("old", job(log, 2))
+        scheduler.rename("old", "new")
+        pending = scheduler.pending("new"), scheduler.pending("old")
+        gate.set()
+        await drain(scheduler)
+        return pending, log
+
+    pending, log = asyncio.run(main())
+    assert pending == (1, 0)
+    assert [name for kind, name in log if kind == "end"] == [1, 2]
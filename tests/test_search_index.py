@@ -0,0 +1,92 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.core import search_index
+from app.core.search_index import SearchIndex
+from app.core.vector_index import VectorIndex
+
+
+class FakeStore:
+    def __init__(self, chats):
+        self.chats = chats
+
+    def load(self, chat):
+        return self.chats[chat]
+
+
+def message(role, content):
+    return {"role": role, "content": content}
+
+
+@pytest.fixture
+def chats():
+    return {
+        "dns": [
+            message("system", "s"),
+            message("user", "how does dns resolution work"),
+            message("assistant", "dns resolution walks from the root servers"),
+        ],
+        "cooking": [message("user", "best way to cook rice")] * 3,
+    }
+
+
+def backfilled(tmp_path, chats):
+    index = SearchIndex(str(tmp_path))
+    index.backfill(FakeStore(chats), {chat: len(m) for chat, m in chats.items()})
+    return index
+
+
+def test_backfill_indexes_and_embeds(tmp_path, chats):
+    index = backfilled(tmp_path, chats)
+    assert index.search("resolution")[0][0] == "dns"
+    assert index.embedded == 5
+    hits = index.recall("how does dns resolution work", 2)
+    assert hits[0] == ("dns", 1, "user", "how does dns resolution work")
+
+
+def test_embedding_runs_outside_the_lock(tmp_path, chats, monkeypatch):
+    monkeypatch.setattr(search_index, "EMBED_CHUNK", 2)
+    held = []
+    original = VectorIndex.embed
+
+    def embed(vectors, text):
+        held.append(index.lock.locked())
+        return original(vectors, text)
+
+    monkeypatch.setattr(VectorIndex, "embed", embed)
+    index = SearchIndex(str(tmp_path))
+    index.backfill(FakeStore(chats), {chat: len(m) for chat, m in chats.items()})
+    index.add_messages("dns", [message("user", "what is a resolver")])
+    assert len(held) == 6 and not any(held)
+    assert index.recall("what is a resolver", 1)[0][1] == 3
+
+
+def test_deleted_chat_is_not_recalled(tmp_path, chats):
+    index = backfilled(tmp_path, chats)
+    index.delete("dns")
+    assert index.recall("how does dns resolution work", 2) == []
+
+
+def test_vectors_survive_reopening(tmp_path, chats):
+    backfilled(tmp_path, chats).db.close()
+    index = SearchIndex(str(tmp_path))
+    index.open_vectors()
+    assert index.embedded == 5
+    assert index.recall("cook rice", 1)[0][0] == "cooking"
+
+
+def test_backfill_inserts_in_chunks(tmp_path, chats, monkeypatch):
+    monkeypatch.setattr(search_index, "INSERT_CHUNK", 2)
+    sizes = []
+    original = SearchIndex.insert
+
+    def insert(index, chat, messages):
+        sizes.append(len(messages))
+        return original(index, chat, messages)
+
+    monkeypatch.setattr(SearchIndex, "insert", insert)
+    index = backfilled(tmp_path, chats)
+    assert sizes == [2, 1, 2, 1]
+    assert index.indexed_count("dns") == 3
+    assert [hit[1] for hit in index.search("rice")] == [0, 1, 2]